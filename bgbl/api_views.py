@@ -1,19 +1,30 @@
+import asyncio
+import calendar
 from collections import OrderedDict
-import logging
+from datetime import date
+from functools import lru_cache
+import hashlib
 import json
+import logging
+import time
+from urllib.parse import quote
 
 import elasticsearch
-from elasticsearch_dsl import (
-    FacetedSearch, TermsFacet, DateHistogramFacet
-)
+from elasticsearch_dsl import TermsFacet, DateHistogramFacet, connections
 from elasticsearch_dsl.faceted_search import Facet
-from elasticsearch_dsl.query import Range, Q
+from elasticsearch_dsl.query import Range
+
+from asgiref.sync import sync_to_async
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Max
+from django.http import StreamingHttpResponse
 from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS
 
 from rest_framework import viewsets, serializers, status
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.filters import BaseFilterBackend
@@ -24,15 +35,24 @@ from rest_framework.pagination import (
     PageNumberPagination, CursorPagination,
     _reverse_ordering, _positive_int, Cursor
 )
-from rest_framework.exceptions import NotFound, APIException
+from rest_framework.exceptions import NotFound, APIException, ParseError
 from rest_framework.utils.urls import (
     replace_query_param, remove_query_param
 )
 from rest_framework.settings import api_settings
 
-from .models import Publication as PublicationModel
-from .renderers import RSSRenderer
-from .search_indexes import Publication
+from .catalogue import get_catalogue
+from .metrics import (
+    API_SERVICE_UNAVAILABLE, API_STAGE_SECONDS, ENABLED as METRICS_ENABLED,
+    record_cache, time_stage
+)
+from .models import (
+    Publication as PublicationModel, PublicationEntry as PublicationEntryModel
+)
+from .renderers import AtomRenderer, JSONRenderer, RSSRenderer
+from .search_indexes import LISTING_ORDERING, Publication, PublicationTitle
+from .search_templates import get_search_template
+from .slow_queries import get_threshold, log_slow_query, should_profile
 
 logger = logging.getLogger(name=__name__)
 
@@ -50,7 +70,10 @@ def make_dict(hit):
         d['score'] = hit.meta.score
     if hasattr(hit.meta, 'highlight'):
         for key in hit.meta.highlight:
-            d['%s__highlight' % key] = list(hit.meta.highlight[key])
+            # Highlights of sub-fields belong to their main field
+            d['%s__highlight' % key.split('.')[0]] = list(
+                hit.meta.highlight[key]
+            )
     return d
 
 
@@ -65,6 +88,16 @@ def dump_facets(facets):
     }
 
 
+def get_msearch_responses(data):
+    responses = data['responses']
+    for response in responses:
+        if 'error' in response:
+            raise elasticsearch.exceptions.TransportError(
+                response.get('status', 500), response['error']
+            )
+    return responses
+
+
 class NumberRangeFacet(Facet):
     agg_type = 'terms'
 
@@ -97,10 +130,94 @@ class NumberRangeFacet(Facet):
         })
 
 
-class PublicationSearch(FacetedSearch):
+class DateRangeFacet(DateHistogramFacet):
+    """
+    Date histogram filtered by ``(from, to)`` pairs of ISO dates, either
+    of them may be ``None``.
+    """
+    def get_value_filter(self, filter_value):
+        start, end = filter_value
+        limits = {}
+        if start is not None:
+            limits['gte'] = start
+        if end is not None:
+            limits['lte'] = end
+        return Range(**{
+            self._params['field']: limits
+        })
+
+    def is_filtered(self, key, filter_values):
+        # Buckets overlapping a filtered range are selected
+        first = key.date().isoformat()
+        after = self.DATE_INTERVALS[self._params['calendar_interval']](
+            key
+        ).date().isoformat()
+        return any(
+            (start is None or start < after) and
+            (end is None or first <= end)
+            for start, end in filter_values
+        )
+
+
+def parse_date_bound(value, end=False):
+    """
+    Parse ``2020``, ``2020-Q2``, ``2020-05`` or ``2020-05-03`` into the
+    ISO date of the first or, with ``end``, the last day of the period.
+    """
+    try:
+        parts = value.split('-')
+        year = int(parts[0])
+        if len(parts) == 1:
+            first_month, last_month = 1, 12
+        elif len(parts) == 2 and parts[1][:1] in ('Q', 'q'):
+            quarter = int(parts[1][1:])
+            if not 1 <= quarter <= 4:
+                raise ValueError
+            first_month, last_month = quarter * 3 - 2, quarter * 3
+        elif len(parts) == 2:
+            first_month = last_month = int(parts[1])
+        elif len(parts) == 3:
+            return date(year, int(parts[1]), int(parts[2])).isoformat()
+        else:
+            raise ValueError
+        if end:
+            last_day = calendar.monthrange(year, last_month)[1]
+            return date(year, last_month, last_day).isoformat()
+        return date(year, first_month, 1).isoformat()
+    except ValueError:
+        raise ParseError('Invalid date.')
+
+
+def get_date_range(params, from_param, to_param):
+    """
+    Return the ``(from, to)`` ISO dates given by two query parameters
+    or ``None`` if both are missing.
+    """
+    start = params.get(from_param)
+    end = params.get(to_param)
+    if not start and not end:
+        return None
+    start = parse_date_bound(start) if start else None
+    end = parse_date_bound(end, end=True) if end else None
+    if start is not None and end is not None and end < start:
+        raise ParseError('Invalid date range.')
+    return start, end
+
+
+class PublicationSearch:
+    """
+    Faceted search like elasticsearch_dsl's ``FacetedSearch`` that
+    assembles its request bodies from the compiled ``SearchTemplate``
+    of the class instead of building DSL objects per request.
+    """
     doc_types = [Publication]
     index = 'offenegesetze_publications'
-    fields = ['title^3', 'content']
+    using = 'default'
+    fields = ['title^3', 'title.decomp^2', 'content', 'content.decomp']
+    # Decomp sub-fields match everything the main fields match
+    highlight_fields = ['title.decomp', 'content.decomp']
+    # Completion inputs are only needed by the suggester
+    source_excludes = ['suggest']
     equivalences = {
         'year': {'date'},
         'date': {'year'}
@@ -112,53 +229,230 @@ class PublicationSearch(FacetedSearch):
         'page': NumberRangeFacet(field='page'),
         'number': NumberRangeFacet(field='number'),
         'order': NumberRangeFacet(field='order'),
-        'date': DateHistogramFacet(
+        'date': DateRangeFacet(
             field='date', calendar_interval='year'
-        )
+        ),
+        'law_date': DateRangeFacet(
+            field='law_date', calendar_interval='year', min_doc_count=1
+        ),
     }
 
+    def __init__(self, query=None, filters=None, sort=(),
+                 track_total_hits=None):
+        self.template = get_search_template(type(self))
+        self._query = query
+        self._sort = sort
+        self._filters = {}
+        self._post_filters = []
+        self._extra = {}
+        self.filter_values = {}
+        for name, value in (filters or {}).items():
+            self.add_filter(name, value)
+        if track_total_hits is None:
+            track_total_hits = (
+                settings.SEARCH_TOTAL_HITS_LIMIT if query
+                else settings.LIST_TOTAL_HITS_LIMIT
+            )
+        self.track_total_hits(track_total_hits)
+
     def __getitem__(self, n):
         assert isinstance(n, slice)
-        self._s = self._s[n]
+        start = n.start or 0
+        self._extra['from'] = start
+        self._extra['size'] = max(0, n.stop - start)
         return self
 
-    def aggregate(self, search):
-        "Respect equivalences of facets"
-
-        for f, facet in self.facets.items():
-            agg = facet.get_aggregation()
-            agg_filter = Q('match_all')
-            for field, filter in self._filters.items():
-                if f == field or field in self.equivalences.get(f, set()):
-                    continue
-                agg_filter &= filter
-            search.aggs.bucket(
-                '_filter_' + f,
-                'filter',
-                filter=agg_filter
-            ).bucket(f, agg)
+    def add_filter(self, name, filter_values):
+        """
+        Add a filter for a facet.
+        """
+        if not isinstance(filter_values, (tuple, list)):
+            if filter_values is None:
+                return
+            filter_values = [filter_values]
+        # Remembered for the selected facet values of the response
+        self.filter_values[name] = filter_values
+        f = self.template.get_filter(name, tuple(filter_values))
+        if f is not None:
+            self._filters[name] = f
+
+    def execute(self):
+        """
+        Execute hits and facets as one multi search, or only the hits
+        when the facets for these filters are cached.
+        """
+        start = time.perf_counter()
+        profile = should_profile()
+        cache_key, facets_data = self.get_cached_facets(profile=profile)
+        es = connections.get_connection(self.using)
+        if facets_data is None:
+            hits_data, facets_data = get_msearch_responses(es.msearch(
+                index=self.index, body=[
+                    {}, self.get_hits_body(),
+                    {'request_cache': True},
+                    self.get_facet_body(profile=profile),
+                ]
+            ))
+            self.set_cached_facets(cache_key, facets_data)
+        else:
+            hits_data = es.search(index=self.index, body=self.get_hits_body())
+        response = self.make_response(hits_data, facets_data)
+        self.check_slow_query(response, time.perf_counter() - start)
+        return response
+
+    async def execute_async(self, es):
+        """
+        Execute hits and facets as two concurrent requests with the
+        AsyncElasticsearch client ``es``.
+        """
+        start = time.perf_counter()
+        profile = should_profile()
+        cache_key, facets_data = await sync_to_async(
+            self.get_cached_facets
+        )(profile=profile)
+        if facets_data is None:
+            hits_data, facets_data = await asyncio.gather(
+                es.search(index=self.index, body=self.get_hits_body()),
+                es.search(
+                    index=self.index,
+                    body=self.get_facet_body(profile=profile),
+                    request_cache=True
+                )
+            )
+            await sync_to_async(self.set_cached_facets)(
+                cache_key, facets_data
+            )
+        else:
+            hits_data = await es.search(
+                index=self.index, body=self.get_hits_body()
+            )
+        response = self.make_response(hits_data, facets_data)
+        self.check_slow_query(response, time.perf_counter() - start)
+        return response
+
+    def execute_facets(self, names=None):
+        """
+        Execute only the facet aggregations, optionally limited to
+        the facets in ``names``, and return their values by facet.
+        """
+        names = [
+            name for name in self.facets if names is None or name in names
+        ]
+        body = self.get_facet_body()
+        body['aggs'] = {
+            '_filter_' + name: body['aggs']['_filter_' + name]
+            for name in names
+        }
+        body['_source'] = False
+        es = connections.get_connection(self.using)
+        response = self.template.make_response(es.search(
+            index=self.index, body=body, request_cache=True
+        ), self)
+        return {
+            name: self.facets[name].get_values(
+                response.aggregations['_filter_' + name][name],
+                self.filter_values.get(name, ())
+            ) for name in names
+        }
+
+    def to_dict(self):
+        body = self.get_hits_body()
+        body['aggs'] = self.template.get_aggs(self._filters)
+        return body
+
+    def get_hits_body(self):
+        """
+        Return the search body without facet aggregations.
+        """
+        return self.template.get_body(
+            self._query,
+            list(self._filters.values()) + self._post_filters,
+            self._sort, self._extra
+        )
+
+    def get_facet_body(self, profile=False):
+        """
+        Return a search body that only computes facet aggregations.
+
+        Facets only depend on query and filters, not on the page.
+        """
+        body = self.template.get_facet_body(self._query, self._filters)
+        if profile:
+            body['profile'] = True
+        return body
+
+    def get_facet_cache_key(self):
+        body = json.dumps(self.get_facet_body(), sort_keys=True)
+        return 'facets:%s:%s' % (
+            self.index, hashlib.sha256(body.encode('utf-8')).hexdigest()
+        )
+
+    def get_cached_facets(self, profile=False):
+        """
+        Return cache key and cached facets response or ``None``.
+        """
+        timeout = getattr(settings, 'FACET_CACHE_TIMEOUT', 0)
+        if not timeout or profile:
+            # Profiled searches need to compute their aggregations
+            return None, None
+        cache_key = self.get_facet_cache_key()
+        facets_data = cache.get(cache_key)
+        record_cache('facets', facets_data is not None)
+        return cache_key, facets_data
+
+    def set_cached_facets(self, cache_key, facets_data):
+        if cache_key is None:
+            return
+        cache.set(
+            cache_key,
+            {'aggregations': facets_data.get('aggregations', {})},
+            settings.FACET_CACHE_TIMEOUT
+        )
+
+    def make_response(self, hits_data, facets_data):
+        """
+        Merge separate hits and facets responses into one faceted response.
+        """
+        data = dict(hits_data)
+        data['took'] = max(hits_data['took'], facets_data.get('took', 0))
+        data['aggregations'] = facets_data.get('aggregations', {})
+        if 'profile' in facets_data:
+            data['profile'] = facets_data['profile']
+        return self.template.make_response(data, self)
+
+    def check_slow_query(self, response, duration):
+        threshold = get_threshold()
+        if threshold is not None and duration >= threshold:
+            log_slow_query(self.to_dict(), response, duration)
 
     def add_sort(self, *sort_args):
         self._sort = sort_args
-        self._s = self._s.sort(*sort_args)
-
-    def add_pagination_filter(self, filter_kwargs):
-        self._s = self._s.filter('range', **filter_kwargs)
 
-    def query(self, search, query):
+    def track_total_hits(self, value):
         """
-        Add query part to ``search``.
-        Override this if you wish to customize the query used.
+        Count matches exactly (``True``) or up to ``value`` hits.
         """
-        if query:
-            return search.query(
-                "simple_query_string",
-                query=query,
-                fields=self.fields,
-                default_operator='and',
-                lenient=True
-            )
-        return search
+        self._extra['track_total_hits'] = value
+
+    def add_pagination_filter(self, filter_kwargs):
+        # Post filter so the cursor does not change facet counts
+        self._post_filters.append({'range': filter_kwargs})
+
+
+class PublicationTitleScopeSearch(PublicationSearch):
+    """
+    Search only in titles of the publication index.
+    """
+    fields = ['title^3', 'title.decomp^2']
+    highlight_fields = ['title.decomp']
+
+
+class PublicationTitleSearch(PublicationTitleScopeSearch):
+    """
+    Search the titles index that has no page content.
+    """
+    doc_types = [PublicationTitle]
+    index = 'offenegesetze_titles'
 
 
 class ElasticResultMixin(object):
@@ -224,6 +518,232 @@ class PublicationDetailSerializer(PublicationSerializer):
     )
 
 
+SITE_PUBLICATION_URL = (
+    'https://offenegesetze.de/veroeffentlichung/{kind}/{year}/{number}'
+)
+DOCUMENT_URL = (
+    'https://media.offenegesetze.de/{kind}/{year}/{kind}_{year}_{number}.pdf'
+)
+EMPTY_VALUES = ([], {}, None)
+DATETIME_FIELD = serializers.DateTimeField()
+
+
+@lru_cache()
+def get_api_url_parts():
+    url = settings.API_URL + reverse(
+        'api:veroeffentlichung-detail', kwargs={'pk': 'PK'}
+    )
+    return tuple(url.rsplit('PK', 1))
+
+
+@lru_cache(maxsize=4096)
+def format_datetime(value):
+    value = Publication._doc_type.mapping['date'].deserialize(value)
+    return DATETIME_FIELD.to_representation(value)
+
+
+def serialize_hit(hit, detail=False):
+    """
+    Build the representation of ``PublicationSerializer`` (or
+    ``PublicationDetailSerializer``) directly from a raw ES hit.
+    """
+    obj = {
+        k: v for k, v in hit.get('_source', {}).items()
+        if v not in EMPTY_VALUES
+    }
+    ret = OrderedDict()
+    ret['id'] = str(hit['_id'])
+    ret['kind'] = str(obj['kind'])
+    ret['year'] = int(obj['year'])
+    ret['number'] = int(obj['number'])
+    if 'date' in obj:
+        ret['date'] = format_datetime(obj['date'])
+
+    pdf_page = obj.get('pdf_page')
+    if pdf_page:
+        page_fragment = '#page={}'.format(pdf_page)
+        ret['url'] = SITE_PUBLICATION_URL.format(**obj) + page_fragment
+    else:
+        ret['url'] = ''
+    api_url_prefix, api_url_suffix = get_api_url_parts()
+    ret['api_url'] = api_url_prefix + quote(
+        ret['id'], safe=RFC3986_SUBDELIMS + '/~:@'
+    ) + api_url_suffix
+    if pdf_page:
+        ret['document_url'] = DOCUMENT_URL.format(**obj) + page_fragment
+    else:
+        ret['document_url'] = ''
+
+    ret['order'] = int(obj['order'])
+    if 'title' in obj:
+        ret['title'] = str(obj['title'])
+    if 'law_date' in obj:
+        ret['law_date'] = format_datetime(obj['law_date'])
+    if 'page' in obj:
+        ret['page'] = int(obj['page'])
+    if 'pdf_page' in obj:
+        ret['pdf_page'] = int(obj['pdf_page'])
+    ret['num_pages'] = int(obj['num_pages'])
+
+    highlight = hit.get('highlight')
+    if highlight:
+        for key in ('title', 'content'):
+            fragments = (
+                highlight.get(key + '.decomp') or highlight.get(key)
+            )
+            if fragments:
+                ret['%s__highlight' % key] = [str(x) for x in fragments]
+    if hit.get('_score'):
+        ret['score'] = float(hit['_score'])
+
+    if detail and 'content' in obj:
+        content = obj['content']
+        if not isinstance(content, list):
+            content = [content]
+        ret['content'] = [
+            str(x) if x is not None else None for x in content
+        ]
+    return ret
+
+
+class PublicationHitSerializer:
+    """
+    Fast replacement for the publication serializers on raw ES hits.
+    """
+    def __init__(self, instance, many=False, detail=False):
+        self.instance = instance
+        self.many = many
+        self.detail = detail
+
+    @property
+    def data(self):
+        if self.many:
+            return [
+                serialize_hit(hit, detail=self.detail)
+                for hit in self.instance
+            ]
+        return serialize_hit(self.instance, detail=self.detail)
+
+
+def get_raw_hits(results):
+    return results.to_dict()['hits']['hits']
+
+
+def parse_page_range(value):
+    """
+    Parse ``3``, ``3-5`` or ``3-`` into 1-based (start, end) pages.
+    """
+    if not value:
+        return None
+    try:
+        if '-' in value:
+            start, end = value.split('-', 1)
+            start = int(start) if start else 1
+            end = int(end) if end else None
+        else:
+            start = end = int(value)
+    except ValueError:
+        raise ParseError('Invalid page range.')
+    if start < 1 or (end is not None and end < start):
+        raise ParseError('Invalid page range.')
+    return start, end
+
+
+def slice_pages(content, pages):
+    if not isinstance(content, list):
+        content = [content]
+    start, end = pages
+    return content[start - 1:end]
+
+
+def get_entry_pages(pk, pages):
+    """
+    Return the requested pages of an entry from the database or ``None``
+    if the entry or its content is not available there.
+    """
+    try:
+        entry = PublicationEntryModel.objects.get_from_id(pk)
+    except PublicationEntryModel.DoesNotExist:
+        return None
+    content = entry.get_pages()
+    if content is None:
+        return None
+    return slice_pages(content, pages)
+
+
+def get_entry_hit(pk, pages=None, include_content=True):
+    """
+    Return entry ``pk`` from the database in the shape of a search hit
+    or ``None`` if it is not available there.
+    """
+    queryset = PublicationEntryModel.objects.select_related('publication')
+    if not include_content:
+        queryset = queryset.defer('content')
+    try:
+        entry = queryset.get_from_id(pk)
+    except PublicationEntryModel.DoesNotExist:
+        return None
+    content = None
+    if include_content:
+        content = entry.get_pages()
+        if content is None:
+            return None
+        if pages is not None:
+            content = slice_pages(content, pages)
+    return entry.get_search_hit(content=content)
+
+
+SUGGEST_SIZE = 10
+SUGGEST_MAX_SIZE = 25
+
+
+def get_suggest_size(value):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return SUGGEST_SIZE
+    return max(1, min(size, SUGGEST_MAX_SIZE))
+
+
+def get_suggestions(es, query, size=SUGGEST_SIZE):
+    """
+    Return ids and titles of entries whose title completes ``query``.
+    """
+    data = es.search(index=Publication._index._name, body={
+        'size': 0,
+        '_source': ['title'],
+        'suggest': {
+            'title': {
+                'prefix': query,
+                'completion': {'field': 'suggest', 'size': size}
+            }
+        }
+    })
+    return [
+        OrderedDict([
+            ('id', option['_id']),
+            ('title', option['_source'].get('title', '')),
+        ])
+        for suggestion in data['suggest']['title']
+        for option in suggestion['options']
+    ]
+
+
+def get_action(view):
+    return getattr(view, 'action', None) or 'unknown'
+
+
+def execute_search(queryset, view=None):
+    action = get_action(view)
+    with time_stage(API_STAGE_SECONDS, action=action, stage='es'):
+        results = queryset.execute()
+    if METRICS_ENABLED:
+        API_STAGE_SECONDS.labels(action=action, stage='es_took').observe(
+            results.took / 1000
+        )
+    return results
+
+
 class CustomPageNumberPagination(PageNumberPagination):
     page_query_param = 'p'
     max_page = 10
@@ -234,6 +754,14 @@ class CustomPageNumberPagination(PageNumberPagination):
         Paginate a queryset if required, either returning a
         page object, or `None` if pagination is not configured for this view.
         """
+        queryset = self.prepare_queryset(queryset, request, view=view)
+        results = execute_search(queryset, view=view)
+        return self.process_results(results)
+
+    def prepare_queryset(self, queryset, request, view=None):
+        """
+        Return the queryset restricted to the requested page.
+        """
         self.request = request
 
         try:
@@ -247,17 +775,25 @@ class CustomPageNumberPagination(PageNumberPagination):
             raise NotFound('Result page number too high.')
 
         offset = (self.page_number - 1) * self.page_size
-        queryset = queryset[offset:offset + self.page_size]
-        self.results = queryset.execute()
+        # Fetch an extra hit to know if there is a next page without
+        # relying on the total count
+        return queryset[offset:offset + self.page_size + 1]
 
-        self.page = self.results[:self.page_size]
+    def process_results(self, results):
+        """
+        Return results and the page of raw hits from executed queryset.
+        """
+        self.results = results
+        hits = get_raw_hits(self.results)
+        self.has_next = len(hits) > self.page_size
+        self.page = hits[:self.page_size]
 
         return self.results, self.page
 
     def get_next_link(self):
         if self.page_number >= self.max_page:
             return None
-        if self.page_number * self.page_size > self.results.hits.total.value:
+        if not self.has_next:
             return None
         url = self.request.build_absolute_uri()
         page_number = self.page_number + 1
@@ -276,17 +812,25 @@ class CustomPageNumberPagination(PageNumberPagination):
 class FilterPagination(CursorPagination):
     page_size = api_settings.PAGE_SIZE
     cursor_query_param = 'offset'
-    ordering = ('-date', 'kind', 'order')
+    ordering = LISTING_ORDERING
 
     def paginate_queryset(self, queryset, request, view=None):
         """
         Paginate a queryset if required, either returning a
         page object, or `None` if pagination is not configured for this view.
         """
+        queryset = self.prepare_queryset(queryset, request, view=view)
+        results = execute_search(queryset, view=view)
+        return self.process_results(results)
+
+    def prepare_queryset(self, queryset, request, view=None):
+        """
+        Return the queryset sorted and restricted to the requested page.
+        """
         self.page_number_pagination = None
         if request.GET.get('q'):
             self.page_number_pagination = CustomPageNumberPagination()
-            return self.page_number_pagination.paginate_queryset(
+            return self.page_number_pagination.prepare_queryset(
                 queryset, request, view=view
             )
 
@@ -319,22 +863,61 @@ class FilterPagination(CursorPagination):
 
             queryset.add_pagination_filter(kwargs)
 
+        self.offset = offset
+        self.reverse = reverse
+        self.current_position = current_position
+
         # If we have an offset cursor then offset the entire page by that amount.
         # We also always fetch an extra item in order to determine if there is a
         # page following on from this one.
-        queryset = queryset[offset:offset + self.page_size + 1]
-        logger.info('ES query: %s', json.dumps(queryset._s.to_dict()))
-        results = queryset.execute()
+        return queryset[offset:offset + self.page_size + 1]
+
+    def process_results(self, results):
+        """
+        Return results and the page of raw hits from executed queryset.
+        """
+        if self.page_number_pagination:
+            return self.page_number_pagination.process_results(results)
+        return results, self.process_hits(get_raw_hits(results))
 
-        self.page = results[:self.page_size]
+    def paginate_entries(self):
+        """
+        Return the page of the unfiltered listing from the database
+        in the shape of search hits.
+        """
+        entries = PublicationEntryModel.objects.select_related(
+            'publication'
+        ).defer('content')
+        if self.current_position is not None:
+            lookup = 'gt' if self.cursor.reverse else 'lt'
+            entries = entries.filter(**{
+                'publication__date__' + lookup: self.current_position
+            })
+        ordering = ('-publication__date', 'publication__kind', 'order')
+        if self.reverse:
+            ordering = _reverse_ordering(ordering)
+        entries = entries.order_by(*ordering)[
+            self.offset:self.offset + self.page_size + 1
+        ]
+        return self.process_hits([entry.get_search_hit() for entry in entries])
+
+    def process_hits(self, hits):
+        """
+        Return the page of ``hits`` and set the cursor positions.
+        """
+        offset = self.offset
+        reverse = self.reverse
+        current_position = self.current_position
+
+        self.page = hits[:self.page_size]
         if reverse:
             self.page = list(reversed(self.page))
 
         # Determine the position of the final item following the page.
-        if len(results) > len(self.page):
+        if len(hits) > len(self.page):
             has_following_position = True
             following_position = self._get_position_from_instance(
-                results[-1], self.ordering
+                hits[-1], self.ordering
             )
         else:
             has_following_position = False
@@ -365,13 +948,13 @@ class FilterPagination(CursorPagination):
         if (self.has_previous or self.has_next) and self.template is not None:
             self.display_page_controls = True
 
-        return results, self.page
+        return self.page
 
     def _get_position_from_instance(self, instance, ordering):
         field_name = ordering[0].lstrip('-')
-        attr = getattr(instance, field_name)
+        attr = instance['_source'].get(field_name)
         if attr:
-            return str(attr).split(' ')[0]
+            return str(attr).split('T')[0].split(' ')[0]
         return None
 
     def decode_cursor(self, request):
@@ -438,6 +1021,7 @@ class FilterPagination(CursorPagination):
     def get_paginated_response(self, data):
         return Response(OrderedDict([
             ('count', data['count']),
+            ('count_is_exact', data['count_is_exact']),
             ('next', self.get_next_link()),
             ('previous', self.get_previous_link()),
             ('results', data['results']),
@@ -445,6 +1029,10 @@ class FilterPagination(CursorPagination):
         ]))
 
 
+FEED_FORMATS = (RSSRenderer.format, AtomRenderer.format)
+TITLE_SCOPE = 'title:'
+
+
 class PublicationFilter(BaseFilterBackend):
     def filter_queryset(self, request, queryset, view):
         filters = {}
@@ -469,20 +1057,53 @@ class PublicationFilter(BaseFilterBackend):
         if filter_page:
             filters['page'] = filter_page
 
+        # Date ranges filter the date facet, so they are equivalent to
+        # year filters for the facets
+        date_range = get_date_range(request.GET, 'date_from', 'date_to')
+        if date_range:
+            filters['date'] = [date_range]
+
+        law_date_range = get_date_range(
+            request.GET, 'law_date_from', 'law_date_to'
+        )
+        if law_date_range:
+            filters['law_date'] = [law_date_range]
+
         query = request.GET.get('q')
+        title_only = False
+        if query and query.startswith(TITLE_SCOPE):
+            query = query[len(TITLE_SCOPE):].strip()
+            title_only = True
 
-        sort = ('-date', 'kind', 'order')
-        if query and not request.GET.get('format') == 'rss':
+        sort = LISTING_ORDERING
+        if query and request.GET.get('format') not in FEED_FORMATS:
             sort = ('_score',)
 
-        queryset = PublicationSearch(
+        track_total_hits = None
+        if request.GET.get('exact_count') in ('1', 'true'):
+            track_total_hits = True
+
+        search_class = self.get_search_class(view, query, title_only)
+        queryset = search_class(
             query=query,
             filters=filters,
-            sort=sort
+            sort=sort,
+            track_total_hits=track_total_hits
         )
 
         return queryset
 
+    def get_search_class(self, view, query, title_only):
+        """
+        Use the titles index for searches that need no page content.
+        """
+        needs_content = view.is_detail_list() or (query and not title_only)
+        if settings.TITLE_INDEX_ENABLED and not needs_content:
+            return PublicationTitleSearch
+        if title_only:
+            return PublicationTitleScopeSearch
+        return PublicationSearch
+
     def get_schema_fields(self, view):
         return [
             coreapi.Field(
@@ -491,7 +1112,8 @@ class PublicationFilter(BaseFilterBackend):
                 location='query',
                 schema=coreschema.String(
                     title='Query',
-                    description='Query with Lucene syntax'
+                    description='Query with Lucene syntax, prefix with '
+                                '"title:" to only search titles'
                 )
             ),
             coreapi.Field(
@@ -530,12 +1152,192 @@ class PublicationFilter(BaseFilterBackend):
                     description='Query by page of issue'
                 )
             ),
+            coreapi.Field(
+                name='date_from',
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Date from',
+                    description='Published on or after the start of this '
+                                'period: 2020, 2020-Q2, 2020-05 or '
+                                '2020-05-03'
+                )
+            ),
+            coreapi.Field(
+                name='date_to',
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Date to',
+                    description='Published on or before the end of this '
+                                'period'
+                )
+            ),
+            coreapi.Field(
+                name='law_date_from',
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Law date from',
+                    description='Law dated on or after the start of this '
+                                'period'
+                )
+            ),
+            coreapi.Field(
+                name='law_date_to',
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Law date to',
+                    description='Law dated on or before the end of this '
+                                'period'
+                )
+            ),
+            coreapi.Field(
+                name='exact_count',
+                required=False,
+                location='query',
+                schema=coreschema.Boolean(
+                    title='Exact count',
+                    description='Count all matches, otherwise counting '
+                                'stops at a limit and count_is_exact is '
+                                'false'
+                )
+            ),
         ]
 
 
-class PublicationViewSet(viewsets.ReadOnlyModelViewSet):
+FILTER_PARAMS = (
+    'q', 'year', 'number', 'kind', 'order', 'page', 'date_from', 'date_to',
+    'law_date_from', 'law_date_to'
+)
+DATA_SOURCE_HEADER = 'X-Data-Source'
+
+
+class PublicationListMixin:
+    def is_detail_list(self):
+        return all(self.request.GET.get(x)
+                   for x in ('year', 'kind', 'number'))
+
+    def is_unfiltered_list(self):
+        return not any(self.request.GET.get(x) for x in FILTER_PARAMS)
+
+    def service_unavailable(self):
+        API_SERVICE_UNAVAILABLE.labels(action=get_action(self)).inc()
+        return ServiceUnavailable()
+
+    def get_catalogue_list_data(self, paginator):
+        """
+        Return the first page of unfiltered feeds from the catalogue or
+        ``None`` if the listing needs a search. Entries indexed since the
+        catalogue was built appear once it is rebuilt after the import.
+        """
+        if (self.request.accepted_renderer.format not in FEED_FORMATS or
+                not self.is_unfiltered_list() or
+                paginator.cursor is not None):
+            return None
+        catalogue = get_catalogue()
+        if catalogue is None:
+            return None
+        page = paginator.process_hits([
+            entry.get_search_hit()
+            for entry in catalogue.latest(paginator.page_size + 1)
+        ])
+        return {
+            'results': PublicationHitSerializer(page, many=True).data,
+            'facets': {},
+            'count': len(catalogue),
+            'count_is_exact': True
+        }
+
+    def get_fallback_hit(self, pk, pages, fields):
+        """
+        Return entry ``pk`` from the database when Elasticsearch failed.
+        """
+        logger.warning('Serving publication %s from database', pk)
+        hit = get_entry_hit(
+            pk, pages, include_content=not fields or 'content' in fields
+        )
+        if hit is None:
+            raise self.service_unavailable()
+        return hit
+
+    def get_fallback_list_data(self, paginator):
+        """
+        Return the unfiltered listing from the database when
+        Elasticsearch failed. Facets are left empty.
+        """
+        logger.warning('Serving publication list from database')
+        page = paginator.paginate_entries()
+        return {
+            'results': PublicationHitSerializer(page, many=True).data,
+            'facets': {},
+            'count': PublicationEntryModel.objects.count(),
+            'count_is_exact': True
+        }
+
+    def get_detail_options(self, request):
+        pages = parse_page_range(request.GET.get('pages'))
+        fields = request.GET.get('fields')
+        if fields:
+            fields = [f.strip() for f in fields.split(',') if f.strip()]
+        return pages, fields or None
+
+    def get_source_excludes(self, pages, fields):
+        """
+        Leave out content if it is not requested at all or only in part.
+        """
+        if pages is not None or (fields and 'content' not in fields):
+            return ['content', 'suggest']
+        return ['suggest']
+
+    def needs_page_content(self, pages, fields):
+        return pages is not None and (not fields or 'content' in fields)
+
+    def get_detail_data(self, hit, fields):
+        with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                        stage='serialize'):
+            data = PublicationHitSerializer(hit, detail=True).data
+        if fields:
+            data = OrderedDict(
+                (key, value) for key, value in data.items() if key in fields
+            )
+        return data
+
+    def stream_detail(self, request, data):
+        renderer = request.accepted_renderer
+        media_type = request.accepted_media_type
+        if (isinstance(renderer, JSONRenderer) and
+                renderer.get_indent(media_type, {}) is None):
+            # Stream large content lists instead of rendering them at once
+            return StreamingHttpResponse(
+                renderer.render_stream(
+                    data, 'content', accepted_media_type=media_type
+                ),
+                content_type=media_type
+            )
+        return None
+
+    def get_list_data(self, results, page):
+        serializer = PublicationHitSerializer(
+            page, many=True, detail=self.is_detail_list()
+        )
+        with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                        stage='serialize'):
+            return {
+                'results': serializer.data,
+                'facets': results.facets.to_dict(),
+                'count': results.hits.total.value,
+                'count_is_exact': results.hits.total.relation == 'eq'
+            }
+
+
+class PublicationViewSet(PublicationListMixin,
+                         viewsets.ReadOnlyModelViewSet):
     filter_backends = (PublicationFilter,)
-    renderer_classes = viewsets.ViewSet.renderer_classes + [RSSRenderer]
+    renderer_classes = [
+        JSONRenderer, BrowsableAPIRenderer, RSSRenderer, AtomRenderer
+    ]
     pagination_class = FilterPagination
 
     serializer_action_classes = {
@@ -545,9 +1347,7 @@ class PublicationViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_serializer_class(self):
         if self.action == 'list':
-            has_filters = all(self.request.GET.get(x)
-                              for x in ('year', 'kind', 'number'))
-            if has_filters:
+            if self.is_detail_list():
                 return PublicationDetailSerializer
             return PublicationSerializer
         elif self.action == 'retrieve':
@@ -558,36 +1358,117 @@ class PublicationViewSet(viewsets.ReadOnlyModelViewSet):
         queryset = Publication.search()
         return queryset
 
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if METRICS_ENABLED and isinstance(response, Response):
+            # Render here instead of in the handler to time it
+            with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                            stage='render'):
+                response.render()
+        return response
+
     def list(self, request):
-        queryset = self.filter_queryset(self.get_queryset())
-        try:
-            results, page = self.paginate_queryset(queryset)
-        except elasticsearch.exceptions.TransportError:
-            raise ServiceUnavailable()
+        paginator = self.paginator
+        queryset = paginator.prepare_queryset(
+            self.filter_queryset(self.get_queryset()), request, view=self
+        )
+        data = self.get_catalogue_list_data(paginator)
+        if data is not None:
+            data_source = 'catalogue'
+        else:
+            try:
+                results, page = paginator.process_results(
+                    execute_search(queryset, view=self)
+                )
+            except elasticsearch.exceptions.TransportError:
+                if not self.is_unfiltered_list():
+                    raise self.service_unavailable()
+                data = self.get_fallback_list_data(paginator)
+                data_source = 'db'
+            else:
+                data = self.get_list_data(results, page)
+                data_source = 'es'
 
-        serializer = self.get_serializer(page, many=True)
-        return self.get_paginated_response({
-            'results': serializer.data,
-            'facets': results.facets.to_dict(),
-            'count': results.hits.total.value
-        })
+        response = self.get_paginated_response(data)
+        response[DATA_SOURCE_HEADER] = data_source
+        return response
 
     @action(detail=False, renderer_classes=(RSSRenderer,))
     def rss(self, request):
         return self.list(request)
 
+    @action(detail=False, renderer_classes=(AtomRenderer,))
+    def atom(self, request):
+        return self.list(request)
+
     def retrieve(self, request, pk=None):
+        pages, fields = self.get_detail_options(request)
+        es = Publication._get_connection()
+        index = Publication._index._name
         try:
-            instance = Publication.get(id=pk)
+            with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                            stage='es'):
+                hit = es.get(
+                    index=index, id=pk,
+                    _source_excludes=self.get_source_excludes(pages, fields)
+                )
+                if self.needs_page_content(pages, fields):
+                    content = get_entry_pages(pk, pages)
+                    if content is None:
+                        content = slice_pages(es.get(
+                            index=index, id=pk, _source_includes=['content']
+                        )['_source'].get('content', []), pages)
+                    hit['_source']['content'] = content
+            data_source = 'es'
         except elasticsearch.exceptions.NotFoundError:
             return Response(status=status.HTTP_404_NOT_FOUND)
         except elasticsearch.exceptions.TransportError:
-            raise ServiceUnavailable()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+            hit = self.get_fallback_hit(pk, pages, fields)
+            data_source = 'db'
+        data = self.get_detail_data(hit, fields)
+        response = self.stream_detail(request, data)
+        if response is None:
+            response = Response(data)
+        response[DATA_SOURCE_HEADER] = data_source
+        return response
+
+    @action(detail=False, renderer_classes=(
+        JSONRenderer, BrowsableAPIRenderer))
+    def facets(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        names = request.GET.getlist('facet') or None
+        try:
+            with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                            stage='es'):
+                facets = queryset.execute_facets(names=names)
+        except elasticsearch.exceptions.TransportError:
+            raise self.service_unavailable()
+        return Response(dump_facets(facets))
+
+    @action(detail=False, renderer_classes=(
+        JSONRenderer, BrowsableAPIRenderer))
+    def suggest(self, request):
+        query = request.GET.get('q', '').strip()
+        if not query:
+            return Response([])
+        size = get_suggest_size(request.GET.get('size'))
+        try:
+            with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                            stage='es'):
+                suggestions = get_suggestions(
+                    Publication._get_connection(), query, size=size
+                )
+        except elasticsearch.exceptions.TransportError:
+            raise self.service_unavailable()
+        return Response(suggestions)
 
     @action(detail=False, methods=['get'])
     def overview(self, request):
+        catalogue = get_catalogue()
+        if catalogue is not None:
+            return Response(catalogue.overview())
         numbers = list(
             PublicationModel.objects
             .values('kind', 'year')
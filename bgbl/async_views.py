@@ -0,0 +1,184 @@
+"""
+Async publication API views for the ASGI application.
+
+They serve list, detail and feeds like ``PublicationViewSet`` but query
+Elasticsearch with ``AsyncElasticsearch``, so a worker keeps serving
+other requests while it waits for search results.
+"""
+from asgiref.sync import sync_to_async
+import elasticsearch
+
+from django.http import Http404, HttpResponse
+
+from rest_framework.exceptions import (
+    APIException, MethodNotAllowed, NotFound
+)
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+
+from .api_views import (
+    DATA_SOURCE_HEADER, FilterPagination, PublicationFilter,
+    PublicationListMixin, get_action, get_entry_pages, slice_pages
+)
+from .metrics import (
+    API_STAGE_SECONDS, ENABLED as METRICS_ENABLED, time_stage
+)
+from .renderers import AtomRenderer, JSONRenderer, RSSRenderer
+from .search_indexes import Publication, get_async_connection
+
+
+class AsyncPublicationView(PublicationListMixin):
+    renderer_classes = [JSONRenderer, RSSRenderer, AtomRenderer]
+    filter_backends = (PublicationFilter,)
+    pagination_class = FilterPagination
+    content_negotiation_class = DefaultContentNegotiation
+
+    def __init__(self, action, handler_name, renderer_classes=None):
+        self.action = action
+        self.handler_name = handler_name
+        if renderer_classes is not None:
+            self.renderer_classes = renderer_classes
+
+    async def dispatch(self, request, **kwargs):
+        self.request = request = Request(request)
+        try:
+            if request.method not in ('GET', 'HEAD'):
+                raise MethodNotAllowed(request.method)
+            self.perform_content_negotiation(request)
+            handler = getattr(self, self.handler_name)
+            return await handler(request, **kwargs)
+        except APIException as exc:
+            return self.handle_exception(request, exc)
+
+    def perform_content_negotiation(self, request):
+        negotiator = self.content_negotiation_class()
+        renderers = [renderer() for renderer in self.renderer_classes]
+        try:
+            renderer, media_type = negotiator.select_renderer(
+                request, renderers
+            )
+        except Http404:
+            raise NotFound()
+        request.accepted_renderer = renderer
+        request.accepted_media_type = media_type
+
+    def handle_exception(self, request, exc):
+        if not hasattr(request, 'accepted_renderer'):
+            request.accepted_renderer = JSONRenderer()
+            request.accepted_media_type = JSONRenderer.media_type
+        return self.render(
+            request, {'detail': exc.detail}, status=exc.status_code
+        )
+
+    def render(self, request, data, status=200):
+        renderer = request.accepted_renderer
+        content_type = request.accepted_media_type
+        if renderer.charset and 'charset' not in content_type:
+            content_type = '{0}; charset={1}'.format(
+                content_type, renderer.charset
+            )
+        content = renderer.render(
+            data, request.accepted_media_type,
+            {'request': request, 'view': self}
+        )
+        return HttpResponse(content, status=status, content_type=content_type)
+
+    async def list(self, request):
+        queryset = Publication.search()
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+
+        paginator = self.pagination_class()
+        queryset = paginator.prepare_queryset(queryset, request, view=self)
+        data = self.get_catalogue_list_data(paginator)
+        if data is not None:
+            data_source = 'catalogue'
+        else:
+            data, data_source = await self.search_list_data(
+                queryset, paginator
+            )
+
+        response = paginator.get_paginated_response(data)
+        with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                        stage='render'):
+            response = self.render(request, response.data)
+        response[DATA_SOURCE_HEADER] = data_source
+        return response
+
+    async def search_list_data(self, queryset, paginator):
+        try:
+            with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                            stage='es'):
+                results = await queryset.execute_async(
+                    get_async_connection()
+                )
+        except elasticsearch.exceptions.TransportError:
+            if not self.is_unfiltered_list():
+                raise self.service_unavailable()
+            data = await sync_to_async(self.get_fallback_list_data)(
+                paginator
+            )
+            return data, 'db'
+        if METRICS_ENABLED:
+            API_STAGE_SECONDS.labels(
+                action=get_action(self), stage='es_took'
+            ).observe(results.took / 1000)
+        results, page = paginator.process_results(results)
+        return self.get_list_data(results, page), 'es'
+
+    async def retrieve(self, request, pk=None):
+        pages, fields = self.get_detail_options(request)
+        es = get_async_connection()
+        index = Publication._index._name
+        try:
+            with time_stage(API_STAGE_SECONDS, action=get_action(self),
+                            stage='es'):
+                hit = await es.get(
+                    index=index, id=pk,
+                    _source_excludes=self.get_source_excludes(pages, fields)
+                )
+                if self.needs_page_content(pages, fields):
+                    content = await sync_to_async(get_entry_pages)(
+                        pk, pages
+                    )
+                    if content is None:
+                        content = slice_pages((await es.get(
+                            index=index, id=pk, _source_includes=['content']
+                        ))['_source'].get('content', []), pages)
+                    hit['_source']['content'] = content
+            data_source = 'es'
+        except elasticsearch.exceptions.NotFoundError:
+            return HttpResponse(status=404)
+        except elasticsearch.exceptions.TransportError:
+            hit = await sync_to_async(self.get_fallback_hit)(
+                pk, pages, fields
+            )
+            data_source = 'db'
+        data = self.get_detail_data(hit, fields)
+        response = self.stream_detail(request, data)
+        if response is None:
+            response = self.render(request, data)
+        response[DATA_SOURCE_HEADER] = data_source
+        return response
+
+
+async def publication_list(request):
+    return await AsyncPublicationView('list', 'list').dispatch(request)
+
+
+async def publication_rss(request):
+    return await AsyncPublicationView(
+        'rss', 'list', renderer_classes=[RSSRenderer]
+    ).dispatch(request)
+
+
+async def publication_atom(request):
+    return await AsyncPublicationView(
+        'atom', 'list', renderer_classes=[AtomRenderer]
+    ).dispatch(request)
+
+
+async def publication_detail(request, pk):
+    return await AsyncPublicationView(
+        'retrieve', 'retrieve'
+    ).dispatch(request, pk=pk)
@@ -0,0 +1,555 @@
+"""
+Helpers for benchmarking the importer and the API without the real
+document archive or a running Elasticsearch.
+
+``FakeConnection`` is an Elasticsearch connection class that keeps
+documents in memory and answers the requests this project sends with
+responses of the right shape. Plug it (or any other connection class)
+into the ``default`` connection with ``use_connection_class`` and
+``AsyncFakeConnection`` into the async clients with
+``use_async_connection_class``.
+"""
+import asyncio
+import calendar
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from datetime import date
+from functools import wraps
+import json
+import os
+import resource
+import threading
+import time
+
+from elasticsearch import Connection
+from elasticsearch_dsl import connections
+from pdfrw import PdfArray, PdfDict, PdfName, PdfWriter
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .pdf_utils import LOGO_HEIGHT, LOGO_WIDTH, WATERMARK_LINES
+from . import search_indexes
+from .search_indexes import OrjsonSerializer, get_suggest_input
+
+PAGE_LINES = 40
+
+WORDS = (
+    'Gesetz Verordnung Bekanntmachung Änderung Bundesregierung Artikel '
+    'Absatz Satz Inkrafttreten Anwendung Vorschrift Bundesminister '
+    'Einkommensteuergesetz Sozialgesetzbuch Übergangsregelung Verkündung '
+    'Zustimmung Bundesrat Ermächtigung Durchführung Rechtsverordnung'
+).split()
+
+
+def use_connection_class(connection_class, **kwargs):
+    if isinstance(connection_class, str):
+        connection_class = import_string(connection_class)
+    connections.create_connection(
+        hosts=[settings.ES_URL], timeout=120, serializer=OrjsonSerializer(),
+        connection_class=connection_class, **kwargs
+    )
+
+
+def use_async_connection_class(connection_class, **kwargs):
+    if isinstance(connection_class, str):
+        connection_class = import_string(connection_class)
+    search_indexes.async_connection_options.update(
+        connection_class=connection_class, **kwargs
+    )
+    search_indexes._async_connections.clear()
+
+
+def get_peak_rss():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def make_text(seed, num_words):
+    return ' '.join(
+        WORDS[(seed * 7 + i * 3) % len(WORDS)] for i in range(num_words)
+    )
+
+
+def make_title(seed):
+    return '%s zur %s des %s' % (
+        WORDS[seed % len(WORDS)],
+        WORDS[(seed + 3) % len(WORDS)],
+        WORDS[(seed + 12) % len(WORDS)],
+    )
+
+
+def pdf_text(text):
+    # Content streams are latin-1, keep generated text plain ASCII
+    text = text.encode('ascii', 'replace').decode('ascii')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_page_stream(page_no):
+    lines = ['BT', '/F1 9 Tf', '11 TL', '50 790 Td']
+    for line_no in range(PAGE_LINES):
+        lines.append('(%s) Tj T*' % pdf_text(
+            make_text(page_no * PAGE_LINES + line_no, 10)
+        ))
+    lines.append('ET')
+    lines.append('q %s 0 0 %s 40 800 cm\n/Im1 Do\nQ' % (
+        LOGO_WIDTH, LOGO_HEIGHT
+    ))
+    lines.append('BT\n/F1 6 Tf\n50 20 Td%s\nET' % WATERMARK_LINES[0])
+    return '\n'.join(lines)
+
+
+def make_pdf(filename, num_pages):
+    font = PdfDict(
+        Type=PdfName.Font,
+        Subtype=PdfName.Type1,
+        BaseFont=PdfName.Helvetica,
+    )
+    logo = PdfDict(
+        Type=PdfName.XObject,
+        Subtype=PdfName.Image,
+        Width=LOGO_WIDTH,
+        Height=LOGO_HEIGHT,
+        ColorSpace=PdfName.DeviceGray,
+        BitsPerComponent=8,
+    )
+    logo.stream = '\x80' * (LOGO_WIDTH * LOGO_HEIGHT)
+
+    writer = PdfWriter()
+    for page_no in range(num_pages):
+        page = PdfDict(
+            Type=PdfName.Page,
+            MediaBox=PdfArray([0, 0, 595, 842]),
+            Resources=PdfDict(
+                Font=PdfDict(F1=font),
+                XObject=PdfDict(Im1=logo),
+            ),
+            Contents=PdfDict(),
+        )
+        page.Contents.stream = make_page_stream(page_no)
+        writer.addpage(page)
+    writer.write(filename)
+
+
+def make_corpus(doc_path, table, issues=10, entries=5, pages=4,
+                kind='bgbl1', year=3000):
+    """
+    Write synthetic issues to ``doc_path`` and matching scraper rows
+    to the ``dataset`` ``table``. Returns the list of pdf filenames.
+    """
+    part = int(kind[-1])
+    filenames = []
+    rows = []
+    for number in range(1, issues + 1):
+        issue_date = date(year, 1 + number % 12, 1 + number % 28)
+        date_str = issue_date.strftime('%d.%m.%Y')
+        start_page = number * (entries * pages + 1)
+        rows.append(dict(
+            part=part, year=year, number=number, order=1, kind='meta',
+            name='Inhaltsverzeichnis', date=date_str, page=start_page,
+            law_date=None
+        ))
+        for i in range(entries):
+            rows.append(dict(
+                part=part, year=year, number=number, order=i + 2,
+                kind='entry', name=make_title(number * entries + i),
+                date=date_str, page=start_page + 1 + i * pages,
+                law_date=date_str
+            ))
+
+        filename = os.path.join(
+            doc_path, kind, str(year),
+            '{kind}_{year}_{number}.pdf'.format(
+                kind=kind, year=year, number=number
+            )
+        )
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        make_pdf(filename, 1 + entries * pages)
+        filenames.append(filename)
+    table.insert_many(rows)
+    return filenames
+
+
+def make_documents(count, kind='bgbl1', year=3000, entries=5, pages=4):
+    """
+    Yield ``(id, source)`` pairs shaped like indexed publications.
+    """
+    for i in range(count):
+        number = 1 + i // entries
+        order = i % entries
+        doc_date = date(year - number // 50, 1 + number % 12, 1 + number % 28)
+        yield '%s-%s-%s-%s' % (kind, doc_date.year, number, order), {
+            'kind': kind,
+            'year': doc_date.year,
+            'number': number,
+            'date': doc_date.isoformat(),
+            'page': 1 + order * pages,
+            'order': order,
+            'num_pages': pages,
+            'title': make_title(i),
+            'suggest': {'input': get_suggest_input(make_title(i))},
+            'law_date': doc_date.isoformat(),
+            'pdf_page': 2 + order * pages,
+            'content': [make_text(i * pages + p, 300) for p in range(pages)],
+        }
+
+
+class Timer:
+    def __init__(self):
+        self.stages = OrderedDict()
+
+    def stage(self, name):
+        return StageTimer(self, name)
+
+    def report(self, stdout):
+        for name, stage in self.stages.items():
+            line = '%-20s %8.3fs' % (name, stage['seconds'])
+            for unit, count in stage['counts'].items():
+                line += '  %10.1f %s/s' % (
+                    count / stage['seconds'] if stage['seconds'] else 0, unit
+                )
+            line += '  peak RSS %6.1f MiB' % (stage['peak_rss'] / 2 ** 20)
+            stdout.write(line)
+
+
+class StageTimer:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.counts = Counter()
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.counts
+
+    def __exit__(self, *args):
+        self.timer.stages[self.name] = {
+            'seconds': time.perf_counter() - self.start,
+            'counts': self.counts,
+            'peak_rss': get_peak_rss(),
+        }
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = max(0, int(round(percent / 100 * len(values))) - 1)
+    return values[index]
+
+
+_stage_times = threading.local()
+
+
+def get_stage_times():
+    if not hasattr(_stage_times, 'times'):
+        _stage_times.times = defaultdict(float)
+    return _stage_times.times
+
+
+def pop_stage_times():
+    times = get_stage_times()
+    _stage_times.times = defaultdict(float)
+    return times
+
+
+def timed(stage, func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            get_stage_times()[stage] += time.perf_counter() - start
+    return wrapper
+
+
+@contextmanager
+def time_stages(*targets):
+    """
+    Accumulate time spent in ``(stage, cls, attribute)`` targets per
+    thread while active. Properties and plain methods are supported.
+    """
+    originals = []
+    for stage, cls, attr in targets:
+        original = cls.__dict__[attr]
+        originals.append((cls, attr, original))
+        if isinstance(original, property):
+            setattr(cls, attr, property(timed(stage, original.fget)))
+        else:
+            setattr(cls, attr, timed(stage, original))
+    try:
+        yield
+    finally:
+        for cls, attr, original in originals:
+            setattr(cls, attr, original)
+
+
+def json_dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def get_field(source, field):
+    value = source.get(field)
+    if isinstance(value, list):
+        return value
+    if value is None:
+        return []
+    return [value]
+
+
+def aggregate(aggs, docs):
+    result = {}
+    for name, agg in aggs.items():
+        sub_aggs = agg.get('aggs', agg.get('aggregations', {}))
+        if 'filter' in agg:
+            result[name] = dict(
+                doc_count=len(docs), **aggregate(sub_aggs, docs)
+            )
+        elif 'terms' in agg:
+            counts = Counter(
+                v for d in docs for v in get_field(d, agg['terms']['field'])
+            )
+            result[name] = {
+                'doc_count_error_upper_bound': 0,
+                'sum_other_doc_count': 0,
+                'buckets': [
+                    {'key': key, 'doc_count': count}
+                    for key, count in counts.most_common(
+                        agg['terms'].get('size', 10)
+                    )
+                ]
+            }
+        elif 'date_histogram' in agg:
+            counts = Counter(
+                v[:4] for d in docs
+                for v in get_field(d, agg['date_histogram']['field'])
+            )
+            result[name] = {'buckets': [{
+                'key_as_string': '%s-01-01T00:00:00.000Z' % year,
+                'key': calendar.timegm((int(year), 1, 1, 0, 0, 0)) * 1000,
+                'doc_count': counts[year]
+            } for year in sorted(counts)]}
+    return result
+
+
+def filter_source(source, source_filter):
+    if source_filter is False:
+        return None
+    if source_filter is None or source_filter is True:
+        return source
+    if isinstance(source_filter, str):
+        source_filter = [source_filter]
+    if isinstance(source_filter, list):
+        source_filter = {'includes': source_filter}
+    includes = source_filter.get('includes')
+    excludes = source_filter.get('excludes', [])
+    return {
+        k: v for k, v in source.items()
+        if (not includes or k in includes) and k not in excludes
+    }
+
+
+class FakeConnection(Connection):
+    """
+    In-memory stand-in for an Elasticsearch node.
+
+    Search requests ignore queries and filters: they page through all
+    documents of the index and compute aggregations over all of them.
+    ``latency`` (seconds) is added to every request to model network and
+    search time.
+    """
+    indices = {}
+
+    def __init__(self, latency=0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    @classmethod
+    def reset(cls):
+        cls.indices.clear()
+
+    @classmethod
+    def load(cls, index, documents):
+        cls.indices.setdefault(index, OrderedDict()).update(documents)
+
+    def perform_request(self, method, url, params=None, body=None,
+                        timeout=None, ignore=(), headers=None):
+        start = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        return self.respond(start, method, url, params, body, ignore)
+
+    def respond(self, start, method, url, params, body, ignore):
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        path = [p for p in url.split('?')[0].split('/') if p]
+        status, data = self.handle(method, path, params or {}, body)
+        took = int((time.perf_counter() - start) * 1000)
+        if isinstance(data, dict) and 'took' in data:
+            data['took'] = took
+        raw_data = json_dumps(data) if data is not None else ''
+        if not (200 <= status < 300) and status not in ignore:
+            self._raise_error(status, raw_data)
+        return status, {'content-type': 'application/json'}, raw_data
+
+    def handle(self, method, path, params, body):
+        if not path:
+            return 200, {'version': {'number': '7.5.1'}}
+        if path[-1] == '_msearch':
+            lines = [json.loads(line) for line in body.splitlines() if line]
+            return 200, {'took': 0, 'responses': [
+                self.search(header.get('index', path[0]), query)
+                for header, query in zip(lines[::2], lines[1::2])
+            ]}
+        index = path[0]
+        if len(path) == 1:
+            if method == 'HEAD':
+                return (200 if index in self.indices else 404), None
+            if method == 'PUT':
+                self.indices.setdefault(index, OrderedDict())
+                return 200, {'acknowledged': True, 'index': index}
+            if method == 'DELETE':
+                self.indices.pop(index, None)
+                return 200, {'acknowledged': True}
+        if path[1] == '_search':
+            return 200, self.search(index, json.loads(body) if body else {})
+        if path[1] == '_delete_by_query':
+            return 200, {'took': 0, 'deleted': 0, 'failures': []}
+        if path[1] == '_doc' and len(path) == 3:
+            return self.document(method, index, path[2], params, body)
+        return 200, {'acknowledged': True}
+
+    def document(self, method, index, doc_id, params, body):
+        docs = self.indices.setdefault(index, OrderedDict())
+        meta = {'_index': index, '_type': '_doc', '_id': doc_id}
+        if method in ('PUT', 'POST'):
+            result = 'updated' if doc_id in docs else 'created'
+            docs[doc_id] = json.loads(body)
+            return 200, dict(
+                meta, _version=1, result=result, _seq_no=0,
+                _primary_term=1
+            )
+        if doc_id not in docs:
+            return 404, dict(meta, found=False)
+        source = filter_source(docs[doc_id], get_source_filter(params))
+        data = dict(meta, _version=1, _seq_no=0, _primary_term=1,
+                    found=True)
+        if source is not None:
+            data['_source'] = source
+        return 200, data
+
+    def search(self, index, body):
+        docs = list(self.indices.get(index, {}).items())
+        if 'suggest' in body:
+            return self.suggest(index, docs, body)
+        offset = body.get('from', 0)
+        size = body.get('size', 10)
+        hits = []
+        for doc_id, doc in docs[offset:offset + size]:
+            hit = {
+                '_index': index, '_type': '_doc', '_id': doc_id,
+                '_score': None if 'sort' in body else 1.0,
+            }
+            source = filter_source(doc, body.get('_source'))
+            if source is not None:
+                hit['_source'] = source
+            if 'sort' in body:
+                hit['sort'] = [
+                    doc.get('date'), doc.get('kind'), doc.get('order')
+                ]
+            if 'highlight' in body and body.get('query'):
+                hit['highlight'] = {
+                    'title': ['<em>%s</em>' % doc.get('title', '')]
+                }
+            hits.append(hit)
+        total = {'value': len(docs), 'relation': 'eq'}
+        limit = body.get('track_total_hits', 10000)
+        if limit is not True and len(docs) > limit:
+            total = {'value': limit, 'relation': 'gte'}
+        return {
+            'took': 0,
+            'timed_out': False,
+            '_shards': {'total': 1, 'successful': 1, 'skipped': 0,
+                        'failed': 0},
+            'hits': {
+                'total': total,
+                'max_score': None,
+                'hits': hits,
+            },
+            'aggregations': aggregate(
+                body.get('aggs', body.get('aggregations', {})),
+                [source for _, source in docs]
+            ),
+        }
+
+    def suggest(self, index, docs, body):
+        suggest = {}
+        for name, options in body['suggest'].items():
+            prefix = options['prefix'].lower()
+            size = options['completion'].get('size', 5)
+            matches = []
+            for doc_id, doc in docs:
+                inputs = doc.get('suggest', {}).get('input', [])
+                if any(x.lower().startswith(prefix) for x in inputs):
+                    matches.append({
+                        'text': doc.get('title'), '_index': index,
+                        '_type': '_doc', '_id': doc_id, '_score': 1.0,
+                        '_source': filter_source(doc, body.get('_source')),
+                    })
+                    if len(matches) == size:
+                        break
+            suggest[name] = [{
+                'text': options['prefix'], 'offset': 0,
+                'length': len(prefix), 'options': matches
+            }]
+        return {
+            'took': 0, 'timed_out': False,
+            'hits': {'total': {'value': 0, 'relation': 'eq'},
+                     'max_score': None, 'hits': []},
+            'suggest': suggest,
+        }
+
+    def close(self):
+        pass
+
+
+def get_param(params, name):
+    # The client encodes list parameters as bytes
+    value = params.get(name)
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return value
+
+
+def get_source_filter(params):
+    source = get_param(params, '_source')
+    includes = get_param(params, '_source_includes')
+    excludes = get_param(params, '_source_excludes')
+    if source in ('false', False):
+        return False
+    if includes or excludes:
+        return {
+            'includes': includes.split(',') if includes else [],
+            'excludes': excludes.split(',') if excludes else [],
+        }
+    if source and source not in ('true', True):
+        return source.split(',')
+    return None
+
+
+class AsyncFakeConnection(FakeConnection):
+    """
+    ``FakeConnection`` for ``AsyncElasticsearch``, waiting for its
+    latency without blocking the event loop.
+    """
+
+    async def perform_request(self, method, url, params=None, body=None,
+                              timeout=None, ignore=(), headers=None):
+        start = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.respond(start, method, url, params, body, ignore)
+
+    async def close(self):
+        pass
@@ -0,0 +1,310 @@
+"""
+Compact catalogue of publication entries for cheap lookups.
+
+``build_catalogue`` writes the metadata of all entries into one binary
+file and bumps a generation file next to it. Workers map the file with
+mmap and reload it when the generation changes, so the overview and
+the latest entries are served without a query.
+
+Only entries that were indexed are included. The catalogue is rebuilt
+after each import, entries indexed or replaced since the last build
+show up once workers see the new generation, at most
+``CATALOGUE_CHECK_INTERVAL`` seconds later.
+
+File layout, all integers little-endian:
+
+- header (``HEADER``)
+- records: one ``RECORD`` per entry ordered by kind, year, number, order
+- by_date: one uint32 record index per entry, ordered like listings
+- titles: UTF-8 titles referenced by offset and length from records
+- kinds and overview as JSON
+
+by_date is read with ``memoryview.cast`` and therefore assumes a
+little-endian host.
+"""
+import datetime
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Publication, PublicationEntry
+
+MAGIC = b'OGCATLG2'
+HEADER = struct.Struct('<8sI4xQQQQQQQ')
+# kind, year, number, order, date, law_date, page, pdf_page, num_pages,
+# title offset, title length
+RECORD = struct.Struct('<BxHHHIIIIIII')
+NONE = 0xFFFFFFFF
+GENERATION_SUFFIX = '.generation'
+
+
+def to_ordinal(value):
+    if value is None:
+        return NONE
+    return value.toordinal()
+
+
+def from_ordinal(value):
+    if value == NONE:
+        return None
+    return datetime.date.fromordinal(value)
+
+
+def to_uint(value):
+    return NONE if value is None else value
+
+
+def from_uint(value):
+    return None if value == NONE else value
+
+
+def get_generation_path(path):
+    return path + GENERATION_SUFFIX
+
+
+def read_generation(path):
+    try:
+        with open(get_generation_path(path)) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomic(path, data):
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def align(buf):
+    buf.extend(b'\0' * (-len(buf) % 8))
+    return len(buf)
+
+
+def build_catalogue(path):
+    """
+    Write the catalogue of all entries to ``path`` and bump its
+    generation. Return the number of entries.
+    """
+    kinds = list(
+        Publication.objects.order_by('kind')
+        .values_list('kind', flat=True).distinct()
+    )
+    kind_index = {kind: i for i, kind in enumerate(kinds)}
+    overview = list(
+        Publication.objects
+        .values('kind', 'year')
+        .order_by('kind', 'year')
+        .annotate(max_number=Max('number'))
+    )
+    # Content is only stored once an entry was indexed, entries without
+    # it have no document to link to
+    entries = PublicationEntry.objects.exclude(content='').values_list(
+        'publication__kind', 'publication__year', 'publication__number',
+        'order', 'publication__date', 'law_date', 'page', 'pdf_page',
+        'num_pages', 'title'
+    )
+    rows = sorted(
+        entries, key=lambda row: (kind_index[row[0]],) + tuple(row[1:4])
+    )
+
+    titles = bytearray()
+    records = bytearray()
+    for row in rows:
+        kind, year, number, order, date, law_date, page, pdf_page = row[:8]
+        title = (row[9] or '').encode('utf-8')
+        records.extend(RECORD.pack(
+            kind_index[kind], year, number, order,
+            to_ordinal(date), to_ordinal(law_date),
+            to_uint(page), to_uint(pdf_page), row[8],
+            len(titles), len(title)
+        ))
+        titles.extend(title)
+
+    # Newest first like the default listing ordering
+    by_date = sorted(
+        range(len(rows)),
+        key=lambda i: (-rows[i][4].toordinal(), rows[i][0], rows[i][3])
+    )
+
+    buf = bytearray(HEADER.size)
+    records_offset = align(buf)
+    buf.extend(records)
+    by_date_offset = align(buf)
+    buf.extend(struct.pack('<%dI' % len(by_date), *by_date))
+    titles_offset = align(buf)
+    buf.extend(titles)
+    meta = json.dumps({'kinds': kinds, 'overview': overview}).encode('utf-8')
+    meta_offset = align(buf)
+    buf.extend(meta)
+    HEADER.pack_into(
+        buf, 0, MAGIC, len(rows), records_offset, by_date_offset,
+        titles_offset, len(titles), meta_offset, len(meta), 0
+    )
+
+    write_atomic(path, bytes(buf))
+    generation = (read_generation(path) or 0) + 1
+    write_atomic(get_generation_path(path), str(generation).encode('ascii'))
+    return len(rows)
+
+
+class CatalogueEntry:
+    __slots__ = (
+        'kind', 'year', 'number', 'order', 'date', 'law_date', 'page',
+        'pdf_page', 'num_pages', 'title'
+    )
+
+    def __init__(self, kind, year, number, order, date, law_date, page,
+                 pdf_page, num_pages, title):
+        self.kind = kind
+        self.year = year
+        self.number = number
+        self.order = order
+        self.date = date
+        self.law_date = law_date
+        self.page = page
+        self.pdf_page = pdf_page
+        self.num_pages = num_pages
+        self.title = title
+
+    @property
+    def index_order(self):
+        return self.order - 2
+
+    @property
+    def search_id(self):
+        return '%s-%s-%s-%s' % (
+            self.kind, self.year, self.number, self.index_order
+        )
+
+    def get_search_hit(self):
+        """
+        Return the entry in the shape of a search index hit.
+        """
+        return {'_id': self.search_id, '_source': {
+            'kind': self.kind,
+            'year': self.year,
+            'number': self.number,
+            'date': self.date.isoformat(),
+            'order': self.index_order,
+            'page': self.page,
+            'pdf_page': self.pdf_page,
+            'law_date': self.law_date.isoformat() if self.law_date else None,
+            'num_pages': self.num_pages,
+            'title': self.title,
+        }}
+
+
+class Catalogue:
+    __slots__ = (
+        'generation', 'count', 'kinds', 'overview_data', '_map',
+        '_records', '_by_date', '_titles'
+    )
+
+    def __init__(self, data, generation=None):
+        (magic, count, records_offset, by_date_offset,
+         titles_offset, titles_length, meta_offset, meta_length,
+         _reserved) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a publication catalogue')
+        view = memoryview(data)
+        self.generation = generation
+        self.count = count
+        self._map = data
+        self._records = view[
+            records_offset:records_offset + count * RECORD.size
+        ]
+        self._by_date = view[by_date_offset:by_date_offset + count * 4].cast(
+            'I'
+        )
+        self._titles = view[titles_offset:titles_offset + titles_length]
+        meta = json.loads(bytes(view[meta_offset:meta_offset + meta_length]))
+        self.kinds = meta['kinds']
+        self.overview_data = meta['overview']
+
+    @classmethod
+    def load(cls, path, generation=None):
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(data, generation=generation)
+
+    def __len__(self):
+        return self.count
+
+    def get_record(self, index):
+        (kind, year, number, order, date, law_date, page, pdf_page,
+         num_pages, title_offset, title_length) = RECORD.unpack_from(
+            self._records, index * RECORD.size
+        )
+        return CatalogueEntry(
+            self.kinds[kind], year, number, order,
+            from_ordinal(date), from_ordinal(law_date),
+            from_uint(page), from_uint(pdf_page), num_pages,
+            str(self._titles[title_offset:title_offset + title_length],
+                'utf-8')
+        )
+
+    def latest(self, count):
+        """
+        Return the ``count`` newest entries in listing order.
+        """
+        return [
+            self.get_record(self._by_date[i])
+            for i in range(min(count, self.count))
+        ]
+
+    def overview(self):
+        return [dict(item) for item in self.overview_data]
+
+
+class CatalogueCache:
+    """
+    Keep the catalogue of a worker and reload it when the generation
+    file changes, checking at most every ``CATALOGUE_CHECK_INTERVAL``
+    seconds.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.catalogue = None
+        self.checked = None
+
+    def get(self, path):
+        now = time.monotonic()
+        interval = getattr(settings, 'CATALOGUE_CHECK_INTERVAL', 5)
+        if self.checked is not None and now - self.checked < interval:
+            return self.catalogue
+        with self.lock:
+            self.checked = now
+            generation = read_generation(path)
+            current = self.catalogue
+            if generation is None:
+                self.catalogue = None
+            elif current is None or current.generation != generation:
+                try:
+                    self.catalogue = Catalogue.load(
+                        path, generation=generation
+                    )
+                except (OSError, ValueError):
+                    self.catalogue = None
+        return self.catalogue
+
+
+_cache = CatalogueCache()
+
+
+def get_catalogue():
+    """
+    Return the current catalogue or ``None`` if it is not configured
+    or not built yet.
+    """
+    path = getattr(settings, 'CATALOGUE_PATH', None)
+    if not path:
+        return None
+    return _cache.get(path)
@@ -1,23 +1,20 @@
 from datetime import date
+import hashlib
 import itertools
+import json
 import logging
 import os
 
-from PyPDF2 import PdfFileReader
-try:
-    import pdflib
-except ImportError:
-    pdflib = None
-
 import dataset
 
 import elasticsearch
 
-from bgbl.models import Publication, PublicationEntry
+from bgbl.metrics import IMPORT_PAGES, IMPORT_STAGE_SECONDS, time_stage
+from bgbl.models import PAGE_SEPARATOR, Publication, PublicationEntry
 from bgbl.search_indexes import (
-    Publication as PublicationIndex,
+    TITLE_FIELDS, Publication as PublicationIndex, PublicationTitle,
+    get_suggest_input
 )
-from .pdf_utils import remove_watermark
 
 logger = logging.getLogger(__name__)
 
@@ -60,17 +57,41 @@ def get_pub_key(entry):
     return (entry['part'], entry['year'], entry['number'])
 
 
+def make_range_filter(values):
+    values = sorted(set(values))
+    if len(values) > 1 and values[-1] - values[0] == len(values) - 1:
+        return {'between': [values[0], values[-1]]}
+    return values
+
+
+# Recorded for issues with entries that could not be imported, never
+# matches a digest so incremental runs import them again
+INCOMPLETE_SOURCE_HASH = 'incomplete'
+
+
+def get_source_hash(entries):
+    digest = hashlib.sha256()
+    for entry in entries:
+        row = {k: v for k, v in entry.items() if k != 'id'}
+        digest.update(
+            json.dumps(row, sort_keys=True, default=str).encode('utf-8')
+        )
+    return digest.hexdigest()
+
+
 class BGBlImporter:
     def __init__(self, db_path, document_path, rerun=False,
                  reindex=False, parts=None, watermark=False,
-                 years=None, numbers=None):
+                 years=None, numbers=None, incremental=False):
         self.db_path = db_path
         db = dataset.connect('sqlite:///' + db_path)
         self.table = db['data']
+        self.create_indexes()
         self.document_path = document_path
         self.rerun = rerun
         self.reindex = reindex
         self.watermark = watermark
+        self.incremental = incremental
         self.years = years
         self.numbers = numbers
         if parts is None:
@@ -82,19 +103,63 @@ class BGBlImporter:
         for part in self.parts:
             self.import_part(part)
 
+    def create_indexes(self):
+        if not self.table.exists:
+            return
+        self.table.create_index(['part', 'year', 'number', 'order'])
+
+    def get_filters(self, part):
+        filters = {'part': part}
+        if self.years is not None:
+            filters['year'] = make_range_filter(self.years)
+        if self.numbers is not None:
+            filters['number'] = make_range_filter(self.numbers)
+        return filters
+
+    def get_source_hashes(self, part):
+        publications = Publication.objects.filter(
+            kind='bgbl%s' % part
+        ).values_list('year', 'number', 'source_hash')
+        return {
+            (part, year, number): source_hash
+            for year, number, source_hash in publications
+        }
+
+    def get_years(self, part):
+        if self.years is not None:
+            return sorted(set(self.years), reverse=True)
+        rows = self.table.distinct('year', part=part)
+        return sorted((row['year'] for row in rows), reverse=True)
+
+    def get_issues(self, part):
+        """
+        Yield issue keys and their entries, loading one year per query
+        """
+        for year in self.get_years(part):
+            filters = self.get_filters(part)
+            filters['year'] = year
+            entries = self.table.find(
+                **filters, order_by=['-number', 'order']
+            )
+            for pub_key, issue_entries in itertools.groupby(
+                    entries, key=get_pub_key):
+                yield pub_key, list(issue_entries)
+
+    def get_pending_issues(self, part):
+        source_hashes = None
+        if self.incremental:
+            source_hashes = self.get_source_hashes(part)
+
+        for pub_key, entries in self.get_issues(part):
+            if source_hashes is not None:
+                known_hash = source_hashes.get(pub_key)
+                if known_hash == get_source_hash(entries):
+                    continue
+            yield pub_key, entries
+
     def get_issue_params(self, part):
-        entries = self.table.find(part=part, order_by=['-year', '-number'])
-        current_pub_key = None
-        for entry in entries:
-            if self.years is not None and entry['year'] not in self.years:
-                continue
-            if (self.numbers is not None and
-                    entry['number'] not in self.numbers):
-                continue
-            pub_key = get_pub_key(entry)
-            if current_pub_key != pub_key:
-                current_pub_key = pub_key
-                yield pub_key
+        for pub_key, _entries in self.get_pending_issues(part):
+            yield pub_key
 
     def get_tasks(self):
         for part in self.parts:
@@ -105,6 +170,7 @@ class BGBlImporter:
                     {
                         'rerun': self.rerun,
                         'reindex': self.reindex,
+                        'incremental': self.incremental,
                     },
                     pub_key
                 )
@@ -115,21 +181,28 @@ class BGBlImporter:
         imp.import_publication(*args[3])
 
     def import_part(self, part):
-        for pub_key in self.get_issue_params(part):
-            print(pub_key)
-            created = self.import_publication(*pub_key)
+        for pub_key, entries in self.get_pending_issues(part):
+            logger.debug('Importing %s', pub_key)
+            created = self.import_publication(*pub_key, entries=entries)
+            if self.incremental:
+                continue
             if not created and not self.rerun and not self.reindex:
                 return
 
-    def import_publication(self, part, year, number):
-        entries = self.table.find(
-            part=part, year=year,
-            number=number, order_by=['order']
-        )
+    def import_publication(self, part, year, number, entries=None):
+        if entries is None:
+            entries = list(self.table.find(
+                part=part, year=year,
+                number=number, order_by=['order']
+            ))
+        source_hash = get_source_hash(entries)
         publication = None
         created = True
+        rerun = self.rerun
+        reindex = self.reindex
         last_pdf_page = None
         last_page = None
+        complete = True
 
         for prev_entry, entry, next_entry in previous_and_next(entries):
             if entry is None:
@@ -145,15 +218,41 @@ class BGBlImporter:
                         'page': entry['page']
                     }
                 )
+                # An empty hash means the issue was imported before
+                # changes were tracked, it only gets recorded.
+                changed = (
+                    self.incremental and not created and
+                    publication.source_hash and
+                    publication.source_hash != source_hash
+                )
+                if changed:
+                    logger.info('Source of %s changed', publication)
+                    rerun = reindex = True
+                    # Entries are indexed and watermarked with the
+                    # corrected values of this instance
+                    publication.date = make_date(entry['date'])
+                    publication.page = entry['page']
+                    publication.save(update_fields=['date', 'page'])
+                    delete_index_entries(publication)
+
                 if self.watermark:
-                    filename = publication.get_path(self.document_path)
-                    remove_watermark(filename, publication=publication)
+                    from .pdf_utils import remove_watermark
 
-                if not created and not self.rerun and not self.reindex:
-                    print('Skipping')
+                    filename = publication.get_path(self.document_path)
+                    with time_stage(IMPORT_STAGE_SECONDS,
+                                    stage='remove_watermark'):
+                        remove_watermark(filename, publication=publication)
+
+                if not created and not rerun and not reindex:
+                    logger.debug('Skipping %s', publication)
+                    if publication.source_hash not in (
+                            source_hash, INCOMPLETE_SOURCE_HASH):
+                        Publication.objects.filter(
+                            id=publication.id
+                        ).update(source_hash=source_hash)
                     return False
 
-                if self.rerun:
+                if rerun:
                     PublicationEntry.objects.filter(
                         publication=publication).delete()
 
@@ -183,6 +282,7 @@ class BGBlImporter:
                         self.document_path
                     )
                 except IOError:
+                    complete = False
                     continue
                 num_pages = total_pages - pdf_page + 1
 
@@ -192,34 +292,61 @@ class BGBlImporter:
                 last_page = num_pages - 1
             last_pdf_page = pdf_page + num_pages - 1
 
-            entry, entry_created = PublicationEntry.objects.get_or_create(
-                publication=publication,
-                order=entry['order'],
-                defaults=dict(
-                    title=entry['name'],
-                    law_date=make_date(entry['law_date']),
-                    page=entry['page'],
-                    num_pages=num_pages,
-                    pdf_page=pdf_page
+            with time_stage(IMPORT_STAGE_SECONDS, stage='orm_write'):
+                entry, entry_created = PublicationEntry.objects.get_or_create(
+                    publication=publication,
+                    order=entry['order'],
+                    defaults=dict(
+                        title=entry['name'],
+                        law_date=make_date(entry['law_date']),
+                        page=entry['page'],
+                        num_pages=num_pages,
+                        pdf_page=pdf_page
+                    )
                 )
-            )
-            if entry_created or self.reindex:
+            if entry_created or reindex:
+                if not os.path.exists(
+                        publication.get_path(self.document_path)):
+                    complete = False
                 text = index_entry(
                     publication, entry,
                     document_path=self.document_path,
-                    reindex=self.reindex
+                    reindex=reindex
                 )
                 if text:
-                    PublicationEntry.objects.filter(id=entry.id).update(
-                        content=text
-                    )
+                    with time_stage(IMPORT_STAGE_SECONDS, stage='orm_write'):
+                        PublicationEntry.objects.filter(id=entry.id).update(
+                            content=text
+                        )
+
+        if publication is not None:
+            if not complete:
+                logger.info('Incomplete import of %s', publication)
+                source_hash = INCOMPLETE_SOURCE_HASH
+            Publication.objects.filter(id=publication.id).update(
+                source_hash=source_hash
+            )
 
         return created
 
 
+def delete_index_entries(pub):
+    # Titles index may not have been created yet
+    for doc_class in (PublicationIndex, PublicationTitle):
+        doc_class.search().filter(
+            'term', kind=pub.kind
+        ).filter(
+            'term', year=pub.year
+        ).filter(
+            'term', number=pub.number
+        ).params(ignore=404).delete()
+
+
 def get_num_pages(pub, document_path):
     if hasattr(pub, 'num_pages'):
         return pub.num_pages
+    from PyPDF2 import PdfFileReader
+
     filename = pub.get_path(document_path)
     pdf_reader = PdfFileReader(filename)
     pub.num_pages = pdf_reader.getNumPages()
@@ -250,6 +377,7 @@ def index_entry(pub, entry, document_path='', reindex=False):
         law_date=entry.law_date,
         num_pages=entry.num_pages,
         title=entry.title,
+        suggest={'input': get_suggest_input(entry.title)},
     )
 
     try:
@@ -267,7 +395,9 @@ def index_entry(pub, entry, document_path='', reindex=False):
         p.meta.id = pub_id
 
     if not hasattr(pub, '_text'):
-        pub._text = list(get_text(pub_path))
+        with time_stage(IMPORT_STAGE_SECONDS, stage='get_text'):
+            pub._text = list(get_text(pub_path))
+        IMPORT_PAGES.inc(len(pub._text))
 
     start = 0
     if entry.pdf_page is not None:
@@ -283,16 +413,29 @@ def index_entry(pub, entry, document_path='', reindex=False):
     TRIES = 5
     for i in range(TRIES):
         try:
-            p.save(timeout='3m')
-            return p
+            with time_stage(IMPORT_STAGE_SECONDS, stage='es_write'):
+                p.save(timeout='3m')
+                PublicationTitle(
+                    meta={'id': pub_id},
+                    **{k: data[k] for k in TITLE_FIELDS}
+                ).save(timeout='3m')
+            break
         except Exception as e:
             logger.exception('Could not save %s (try %s)', pub_id, i)
             if i == TRIES - 1:
                 raise e
-    return '\n\n\n'.join(text)
+    return PAGE_SEPARATOR.join(text)
 
 
 def get_text(filename):
+    # PDF libraries are only needed while importing, load them here to
+    # keep them out of every process that imports this module
+    from PyPDF2 import PdfFileReader
+    try:
+        import pdflib
+    except ImportError:
+        pdflib = None
+
     pdf_reader = PdfFileReader(filename)
     num_pages = pdf_reader.getNumPages()
     pages = range(num_pages)
@@ -0,0 +1,213 @@
+import copy
+import time
+
+from django.core.management.base import BaseCommand
+
+from elasticsearch import helpers
+from elasticsearch_dsl import Text
+
+from bgbl.api_views import PublicationSearch
+from bgbl.benchmark import make_documents, percentile
+from bgbl.search_indexes import (
+    Publication, og_analyzer, og_quote_analyzer
+)
+
+# German legal queries compared between both analysis setups
+QUERIES = [
+    'Einkommensteuer',
+    'Einkommensteuergesetz',
+    'Umsatzsteuer',
+    'Steuer',
+    'Sozialgesetzbuch',
+    'Rentenversicherung',
+    'Krankenversicherung',
+    'Pflegeversicherung',
+    'Arbeitslosengeld',
+    'Bundesdatenschutzgesetz',
+    'Datenschutz',
+    'Aufenthaltsgesetz',
+    'Infektionsschutzgesetz',
+    'Straßenverkehrsordnung',
+    'Kraftfahrzeugsteuer',
+    'Mindestlohn',
+    'Bundeswehr Verordnung',
+    'Änderung Strafgesetzbuch',
+    '"Gesetz zur Änderung"',
+    'Bekanntmachung Neufassung',
+]
+LEGACY_FIELDS = ['title^3', 'content']
+
+
+def legacy_text_field(**kwargs):
+    return Text(
+        analyzer=og_analyzer,
+        search_analyzer=og_analyzer,
+        search_quote_analyzer=og_quote_analyzer,
+        index_options='offsets',
+        **kwargs
+    ).to_dict()
+
+
+def get_index_bodies():
+    """
+    Return index bodies of the current analysis and of the previous one
+    that decompounded queries with og_analyzer.
+    """
+    current = Publication._index.to_dict()
+    legacy = copy.deepcopy(current)
+    properties = legacy['mappings']['properties']
+    properties['title'] = legacy_text_field(
+        fields={'raw': {'type': 'keyword'}}
+    )
+    properties['content'] = legacy_text_field()
+    return current, legacy
+
+
+def make_query(query, fields, size):
+    return {
+        'query': {
+            'simple_query_string': {
+                'query': query,
+                'fields': fields,
+                'default_operator': 'and',
+                'lenient': True,
+            }
+        },
+        'size': size,
+        '_source': False,
+        'track_total_hits': True,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare query latency and recall of the index time decompounding '
+        'with decompounding queries on a running Elasticsearch'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source-index', dest='source_index',
+                            default=Publication._index._name,
+                            help='Copy documents from this index')
+        parser.add_argument('--synthetic', action='store_true',
+                            help='Index synthetic documents instead')
+        parser.add_argument('--documents', type=int, default=5000)
+        parser.add_argument('--runs', type=int, default=20,
+                            help='Runs per query and index')
+        parser.add_argument('--size', type=int, default=20,
+                            help='Hits compared per query')
+        parser.add_argument('--prefix', default='og_benchmark_analysis')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the benchmark indices')
+
+    def handle(self, *args, **options):
+        es = Publication._get_connection()
+        current_body, legacy_body = get_index_bodies()
+        indices = {
+            'legacy': options['prefix'] + '_legacy',
+            'decomp': options['prefix'] + '_decomp',
+        }
+        bodies = {'legacy': legacy_body, 'decomp': current_body}
+        fields = {'legacy': LEGACY_FIELDS, 'decomp': PublicationSearch.fields}
+
+        try:
+            for name, index in indices.items():
+                es.indices.delete(index=index, ignore=[404])
+                es.indices.create(index=index, body=bodies[name])
+            for name, index in indices.items():
+                start = time.perf_counter()
+                count = self.load(es, index, options)
+                self.stdout.write('Indexed %d documents into %s in %.1fs' % (
+                    count, index, time.perf_counter() - start
+                ))
+            es.indices.refresh(index=','.join(indices.values()))
+            self.compare(es, indices, fields, options)
+        finally:
+            if options['keep']:
+                self.stdout.write('Indices kept: %s' % ', '.join(
+                    indices.values()
+                ))
+            else:
+                for index in indices.values():
+                    es.indices.delete(index=index, ignore=[404])
+
+    def get_documents(self, es, options):
+        if options['synthetic']:
+            yield from make_documents(options['documents'])
+            return
+        hits = helpers.scan(
+            es, index=options['source_index'],
+            query={'_source': {'excludes': ['suggest']}},
+            size=500
+        )
+        for i, hit in enumerate(hits):
+            if i == options['documents']:
+                break
+            yield hit['_id'], hit['_source']
+
+    def load(self, es, index, options):
+        count, _ = helpers.bulk(es, (
+            {'_index': index, '_id': doc_id, '_source': source}
+            for doc_id, source in self.get_documents(es, options)
+        ))
+        return count
+
+    def search(self, es, index, body):
+        start = time.perf_counter()
+        data = es.search(index=index, body=body, request_cache=False)
+        return data, time.perf_counter() - start
+
+    def compare(self, es, indices, fields, options):
+        self.stdout.write('  %-28s %9s %9s %9s %9s %8s %8s %7s' % (
+            'query', 'old took', 'new took', 'old p95', 'new p95',
+            'old hits', 'new hits', 'overlap'
+        ))
+        totals = {'legacy': [], 'decomp': []}
+        overlaps = []
+        recalls = []
+        for query in QUERIES:
+            took = {}
+            wall = {}
+            results = {}
+            for name, index in indices.items():
+                body = make_query(query, fields[name], options['size'])
+                took[name] = []
+                wall[name] = []
+                for _ in range(options['runs']):
+                    data, duration = self.search(es, index, body)
+                    took[name].append(data['took'])
+                    wall[name].append(duration * 1000)
+                results[name] = data
+                totals[name].append(percentile(took[name], 50))
+
+            legacy_ids = [h['_id'] for h in results['legacy']['hits']['hits']]
+            decomp_ids = {h['_id'] for h in results['decomp']['hits']['hits']}
+            overlap = (
+                len(decomp_ids.intersection(legacy_ids)) / len(legacy_ids)
+                if legacy_ids else 1.0
+            )
+            overlaps.append(overlap)
+            old_total = results['legacy']['hits']['total']['value']
+            new_total = results['decomp']['hits']['total']['value']
+            recalls.append(new_total / old_total if old_total else 1.0)
+            self.stdout.write(
+                '  %-28s %7.1fms %7.1fms %7.1fms %7.1fms %8d %8d %6.0f%%' % (
+                    query[:28],
+                    percentile(took['legacy'], 50),
+                    percentile(took['decomp'], 50),
+                    percentile(wall['legacy'], 95),
+                    percentile(wall['decomp'], 95),
+                    old_total, new_total, overlap * 100
+                )
+            )
+
+        def mean(values):
+            return sum(values) / len(values) if values else 0
+
+        self.stdout.write('Mean p50 took: old %.1fms, new %.1fms' % (
+            mean(totals['legacy']), mean(totals['decomp'])
+        ))
+        self.stdout.write(
+            'Mean hit count ratio new/old: %.2f, mean top %d overlap: '
+            '%.0f%%' % (mean(recalls), options['size'], mean(overlaps) * 100)
+        )
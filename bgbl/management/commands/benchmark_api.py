@@ -0,0 +1,264 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import random
+import re
+import time
+import tracemalloc
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from elasticsearch import Transport
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+
+from bgbl.api_views import PublicationHitSerializer
+from bgbl.benchmark import (
+    FakeConnection, make_documents, percentile, pop_stage_times,
+    time_stages, use_async_connection_class, use_connection_class
+)
+from bgbl.search_indexes import Publication, close_async_connections
+
+QUERY_MIX = {
+    'list': ['/v1/veroeffentlichung/'],
+    'filter': [
+        '/v1/veroeffentlichung/?year=2990&kind=bgbl1',
+        '/v1/veroeffentlichung/?year=2980-2990',
+        '/v1/veroeffentlichung/?date_from=2990-Q2&date_to=2990-Q2',
+        '/v1/veroeffentlichung/?law_date_from=2989&law_date_to=2990-06',
+    ],
+    'search': [
+        '/v1/veroeffentlichung/?q=gesetz',
+        '/v1/veroeffentlichung/?q=einkommensteuergesetz&kind=bgbl1',
+    ],
+    'issue': ['/v1/veroeffentlichung/?year=2990&kind=bgbl1&number=3'],
+    'detail': ['/v1/veroeffentlichung/bgbl1-2990-3-0/'],
+    'rss': ['/v1/veroeffentlichung/rss/'],
+    'suggest': [
+        '/v1/veroeffentlichung/suggest/?q=ges',
+        '/v1/veroeffentlichung/suggest/?q=einkommen',
+    ],
+    'overview': ['/v1/veroeffentlichung/overview/'],
+}
+DEFAULT_WEIGHTS = (
+    'list=4,filter=3,search=3,issue=1,detail=3,rss=1,overview=1,suggest=2'
+)
+ACCESS_LOG_PATTERN = re.compile(r'"GET (/v1/veroeffentlichung/\S*) HTTP')
+
+
+def parse_weights(value):
+    weights = {}
+    for part in value.split(','):
+        name, weight = part.split('=')
+        weights[name.strip()] = int(weight)
+    return weights
+
+
+def classify(path):
+    if '/rss/' in path or 'format=rss' in path:
+        return 'rss'
+    if '/overview/' in path:
+        return 'overview'
+    if '/suggest/' in path:
+        return 'suggest'
+    if '?' not in path and path.rstrip('/') != '/v1/veroeffentlichung':
+        return 'detail'
+    if 'q=' in path:
+        return 'search'
+    if 'number=' in path:
+        return 'issue'
+    if '?' in path:
+        return 'filter'
+    return 'list'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency of the publication API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per concurrency level')
+        parser.add_argument('--concurrency', default='1,4,16',
+                            help='Comma-separated concurrency levels')
+        parser.add_argument('--mix', default=DEFAULT_WEIGHTS,
+                            help='Weights of request types')
+        parser.add_argument('--access-log', dest='access_log',
+                            help='Replay GET requests from an access log')
+        parser.add_argument('--url', help='Benchmark a running server '
+                            'instead of the Django test client')
+        parser.add_argument('--connection-class', dest='connection_class',
+                            default='bgbl.benchmark.FakeConnection',
+                            help='Elasticsearch connection class')
+        parser.add_argument('--asgi', action='store_true',
+                            help='Run requests concurrently against the '
+                            'async views in one event loop')
+        parser.add_argument('--async-connection-class',
+                            dest='async_connection_class',
+                            default='bgbl.benchmark.AsyncFakeConnection',
+                            help='Connection class of the async client')
+        parser.add_argument('--documents', type=int, default=5000,
+                            help='Documents loaded into the fake ES')
+        parser.add_argument('--latency', type=float, default=5,
+                            help='Latency of fake ES requests in ms')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['url'] is None:
+            use_connection_class(
+                options['connection_class'],
+                latency=options['latency'] / 1000
+            )
+            use_async_connection_class(
+                options['async_connection_class'],
+                latency=options['latency'] / 1000
+            )
+            FakeConnection.load(
+                Publication._index._name,
+                make_documents(options['documents'], year=2990)
+            )
+
+        paths = self.get_paths(options)
+
+        for concurrency in options['concurrency'].split(','):
+            concurrency = int(concurrency)
+            self.stdout.write('Concurrency %s' % concurrency)
+            if options['url'] is not None:
+                results, duration = self.run(
+                    paths, concurrency, self.make_url_request(options['url'])
+                )
+            elif options['asgi']:
+                # Stages are timed per thread, they are not reported here.
+                # The async test client always sends the testserver host.
+                with override_settings(
+                        ROOT_URLCONF='offenegesetze.asgi_urls',
+                        ALLOWED_HOSTS=['testserver']):
+                    results, duration = asyncio.run(
+                        self.run_async(paths, concurrency)
+                    )
+            else:
+                with time_stages(
+                        ('es', Transport, 'perform_request'),
+                        ('serialize', BaseSerializer, 'data'),
+                        ('serialize', PublicationHitSerializer, 'data'),
+                        ('render', Response, 'rendered_content')):
+                    results, duration = self.run(
+                        paths, concurrency, self.make_client_request()
+                    )
+            self.report(results, duration)
+
+        if options['url'] is None:
+            self.report_allocations(paths)
+
+    def get_paths(self, options):
+        rng = random.Random(options['seed'])
+        if options['access_log']:
+            with open(options['access_log']) as f:
+                paths = [
+                    m.group(1) for m in map(ACCESS_LOG_PATTERN.search, f) if m
+                ]
+            return list(itertools.islice(
+                itertools.cycle(paths), options['requests']
+            ))
+        weights = parse_weights(options['mix'])
+        names = list(weights)
+        choices = rng.choices(
+            names, weights=[weights[n] for n in names], k=options['requests']
+        )
+        return [rng.choice(QUERY_MIX[name]) for name in choices]
+
+    def make_client_request(self):
+        def request(path):
+            response = Client().get(path, HTTP_HOST='localhost')
+            assert response.status_code == 200, (path, response.status_code)
+            if response.streaming:
+                return b''.join(response.streaming_content)
+            return response.content
+        return request
+
+    def make_url_request(self, base_url):
+        def request(path):
+            with urlopen(base_url.rstrip('/') + path) as response:
+                return response.read()
+        return request
+
+    def run(self, paths, concurrency, request):
+        def timed_request(path):
+            pop_stage_times()
+            start = time.perf_counter()
+            request(path)
+            duration = time.perf_counter() - start
+            return classify(path), duration, pop_stage_times()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed_request, paths))
+        return results, time.perf_counter() - start
+
+    async def run_async(self, paths, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed_request(path):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                assert response.status_code == 200, (
+                    path, response.status_code
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                return classify(path), time.perf_counter() - start, {}
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*map(timed_request, paths))
+        duration = time.perf_counter() - start
+        await close_async_connections()
+        return results, duration
+
+    def report(self, results, duration):
+        self.stdout.write('  %d requests in %.2fs, %.1f req/s' % (
+            len(results), duration, len(results) / duration
+        ))
+        self.stdout.write('  %-10s %6s %8s %8s %8s %8s %8s %8s' % (
+            'type', 'n', 'p50', 'p95', 'p99', 'es', 'serial.', 'render'
+        ))
+        by_type = {}
+        for kind, latency, stages in results:
+            by_type.setdefault(kind, []).append((latency, stages))
+        for kind, values in sorted(by_type.items()):
+            latencies = [v[0] * 1000 for v in values]
+
+            def mean(stage):
+                return sum(v[1].get(stage, 0) for v in values) * 1000 / len(
+                    values)
+
+            self.stdout.write(
+                '  %-10s %6d %8.1f %8.1f %8.1f %8.1f %8.1f %8.1f' % (
+                    kind, len(values),
+                    percentile(latencies, 50),
+                    percentile(latencies, 95),
+                    percentile(latencies, 99),
+                    mean('es'), mean('serialize'), mean('render'),
+                )
+            )
+
+    def report_allocations(self, paths):
+        self.stdout.write('Traced memory per request')
+        request = self.make_client_request()
+        seen = set()
+        for path in paths:
+            kind = classify(path)
+            if kind in seen:
+                continue
+            seen.add(kind)
+            request(path)
+            tracemalloc.start()
+            request(path)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write('  %-10s peak %8.1f KiB  retained %8.1f KiB' % (
+                kind, peak / 1024, current / 1024
+            ))
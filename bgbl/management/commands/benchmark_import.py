@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+import dataset
+
+from bgbl.benchmark import Timer, make_corpus, use_connection_class
+from bgbl.importer import BGBlImporter, get_text
+from bgbl.models import Publication
+from bgbl.pdf_utils import remove_watermark, remove_watermark_objects
+
+from pdfrw import PdfReader
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the importer on a synthetic corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, default=20)
+        parser.add_argument('--entries', type=int, default=5,
+                            help='Entries per issue')
+        parser.add_argument('--pages', type=int, default=4,
+                            help='Pages per entry')
+        parser.add_argument('--connection-class', dest='connection_class',
+                            default='bgbl.benchmark.FakeConnection',
+                            help='Elasticsearch connection class')
+        parser.add_argument('--latency', type=float, default=0,
+                            help='Latency of fake ES requests in ms')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the generated corpus')
+
+    def handle(self, *args, **options):
+        use_connection_class(
+            options['connection_class'], latency=options['latency'] / 1000
+        )
+        doc_path = tempfile.mkdtemp(prefix='og_benchmark_')
+        timer = Timer()
+        try:
+            with transaction.atomic():
+                self.run(doc_path, timer, options)
+                transaction.set_rollback(True)
+        finally:
+            if options['keep']:
+                self.stdout.write('Corpus kept in %s' % doc_path)
+            else:
+                shutil.rmtree(doc_path)
+        timer.report(self.stdout)
+
+    def run(self, doc_path, timer, options):
+        db_path = os.path.join(doc_path, 'data.sqlite')
+        table = dataset.connect('sqlite:///' + db_path)['data']
+
+        with timer.stage('make_corpus') as counts:
+            filenames = make_corpus(
+                doc_path, table, issues=options['issues'],
+                entries=options['entries'], pages=options['pages']
+            )
+            counts['issues'] += len(filenames)
+
+        with timer.stage('get_text') as counts:
+            for filename in filenames:
+                counts['pages'] += len(list(get_text(filename)))
+
+        importer = BGBlImporter(db_path, doc_path, years=[3000], parts=[1])
+        with timer.stage('import') as counts:
+            importer.run_import()
+            counts['entries'] += sum(
+                pub.entries.count() for pub in
+                Publication.objects.filter(kind='bgbl1', year=3000)
+            )
+
+        if shutil.which('qpdf') is not None:
+            with timer.stage('remove_watermark') as counts:
+                for filename in filenames:
+                    remove_watermark(filename, force=True)
+                    counts['pages'] += len(PdfReader(filename).pages)
+        else:
+            self.stderr.write(
+                'qpdf not found, only timing watermark object removal'
+            )
+            with timer.stage('remove_watermark_objects') as counts:
+                for filename in filenames:
+                    doc = PdfReader(filename)
+                    remove_watermark_objects(doc)
+                    counts['pages'] += len(doc.pages)
@@ -0,0 +1,162 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from elasticsearch_dsl import FacetedSearch
+from elasticsearch_dsl.query import Q
+
+from bgbl.api_views import (
+    LISTING_ORDERING, PublicationSearch, PublicationTitleSearch
+)
+
+SCENARIOS = [
+    ('list', PublicationSearch, {
+        'filters': {}, 'sort': LISTING_ORDERING,
+    }),
+    ('list filtered, cursor', PublicationSearch, {
+        'filters': {'year': ['2019'], 'kind': ['bgbl1']},
+        'sort': LISTING_ORDERING,
+        'pagination': {'date': {'lt': '2019-06-01'}},
+    }),
+    ('search', PublicationSearch, {
+        'query': 'Einkommensteuergesetz', 'filters': {'year': ['2010-']},
+        'sort': ('_score',),
+    }),
+    ('titles list', PublicationTitleSearch, {
+        'filters': {'kind': ['bgbl2'], 'number': ['3-7']},
+        'sort': LISTING_ORDERING,
+    }),
+]
+
+
+def make_legacy_class(search_class):
+    """
+    Return a ``FacetedSearch`` building the same bodies as
+    ``search_class`` with DSL objects on each request, like the search
+    classes did before their bodies were compiled.
+    """
+    class LegacySearch(FacetedSearch):
+        doc_types = search_class.doc_types
+        index = search_class.index
+        fields = search_class.fields
+        highlight_fields = search_class.highlight_fields
+        equivalences = search_class.equivalences
+        facets = search_class.facets
+
+        def __init__(self, query=None, filters=None, sort=(),
+                     track_total_hits=None):
+            super().__init__(query=query, filters=filters or {}, sort=sort)
+            if track_total_hits is None:
+                track_total_hits = (
+                    settings.SEARCH_TOTAL_HITS_LIMIT if query
+                    else settings.LIST_TOTAL_HITS_LIMIT
+                )
+            self._s = self._s.extra(track_total_hits=track_total_hits)
+
+        def __getitem__(self, n):
+            self._s = self._s[n]
+            return self
+
+        def search(self):
+            return super().search().source(
+                excludes=search_class.source_excludes
+            )
+
+        def highlight(self, search):
+            return search.highlight(*self.highlight_fields)
+
+        def query(self, search, query):
+            if query:
+                return search.query(
+                    'simple_query_string', query=query, fields=self.fields,
+                    default_operator='and', lenient=True
+                )
+            return search
+
+        def aggregate(self, search):
+            for f, facet in self.facets.items():
+                agg_filter = Q('match_all')
+                for field, filter in self._filters.items():
+                    if f == field or field in self.equivalences.get(f, ()):
+                        continue
+                    agg_filter &= filter
+                search.aggs.bucket(
+                    '_filter_' + f, 'filter', filter=agg_filter
+                ).bucket(f, facet.get_aggregation())
+
+        def add_sort(self, *sort_args):
+            self._s = self._s.sort(*sort_args)
+
+        def add_pagination_filter(self, filter_kwargs):
+            self._s = self._s.post_filter('range', **filter_kwargs)
+
+        def get_hits_body(self):
+            body = self._s.to_dict()
+            body.pop('aggs', None)
+            return body
+
+        def get_facet_body(self):
+            body = {
+                k: v for k, v in self._s.to_dict().items()
+                if k in ('query', 'aggs')
+            }
+            body['size'] = 0
+            return body
+
+    return LegacySearch
+
+
+def build_bodies(search_class, params, page_size):
+    search = search_class(
+        query=params.get('query'), filters=params['filters'],
+        sort=params['sort']
+    )
+    search.add_sort(*params['sort'])
+    if 'pagination' in params:
+        search.add_pagination_filter(params['pagination'])
+    search = search[0:page_size + 1]
+    return search.get_hits_body(), search.get_facet_body()
+
+
+def normalize(bodies):
+    return json.loads(json.dumps(bodies, sort_keys=True))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the cost of building search request bodies with '
+        'elasticsearch_dsl objects and from compiled templates'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000,
+                            help='Bodies built per scenario and variant')
+        parser.add_argument('--page-size', dest='page_size', type=int,
+                            default=20)
+
+    def measure(self, search_class, params, options):
+        build_bodies(search_class, params, options['page_size'])
+        start = time.perf_counter()
+        for _ in range(options['requests']):
+            build_bodies(search_class, params, options['page_size'])
+        return (time.perf_counter() - start) / options['requests'] * 1e6
+
+    def handle(self, *args, **options):
+        self.stdout.write('  %-24s %10s %10s %8s  %s' % (
+            'scenario', 'dsl', 'compiled', 'speedup', 'same bodies'
+        ))
+        for name, search_class, params in SCENARIOS:
+            legacy_class = make_legacy_class(search_class)
+            same = normalize(
+                build_bodies(legacy_class, params, options['page_size'])
+            ) == normalize(
+                build_bodies(search_class, params, options['page_size'])
+            )
+            legacy = self.measure(legacy_class, params, options)
+            compiled = self.measure(search_class, params, options)
+            self.stdout.write('  %-24s %8.1fus %8.1fus %7.1fx  %s' % (
+                name, legacy, compiled, legacy / compiled,
+                'yes' if same else 'no'
+            ))
@@ -0,0 +1,106 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from bgbl.benchmark import percentile
+
+# Modules that used to be loaded by every process
+HEAVY_MODULES = [
+    'sentry_sdk', 'elasticsearch_dsl', 'pdfrw', 'PyPDF2', 'pdflib',
+    'feedgen', 'aiohttp',
+]
+
+REPORT = '''
+import json, sys
+es = sys.modules.get('elasticsearch_dsl.connections')
+print(json.dumps({
+    'modules': [m for m in %r if m in sys.modules],
+    'es_client': es is not None and 'default' in es.connections._conns,
+}))
+''' % HEAVY_MODULES
+
+SETUP = '''
+import django
+django.setup()
+'''
+
+WSGI = '''
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+application = get_wsgi_application()
+get_resolver(settings.ROOT_URLCONF).url_patterns
+'''
+
+ASGI = '''
+from django.core.asgi import get_asgi_application
+from django.urls import get_resolver
+application = get_asgi_application()
+get_resolver('offenegesetze.asgi_urls').url_patterns
+'''
+
+COMMAND = '''
+from django.core.management import execute_from_command_line
+execute_from_command_line(%r)
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the startup time of web workers and management commands '
+        'in fresh interpreters'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=10)
+
+    def get_scenarios(self, doc_path):
+        manage = ['manage.py']
+        return [
+            ('django.setup()', SETUP),
+            ('wsgi worker', WSGI),
+            ('asgi worker', ASGI),
+            ('manage.py check', COMMAND % (manage + ['check'])),
+            ('manage.py remove_watermark', COMMAND % (
+                manage + ['remove_watermark', doc_path]
+            )),
+            ('manage.py fix_glyphs', COMMAND % (
+                manage + ['fix_glyphs', doc_path]
+            )),
+        ]
+
+    def run_scenario(self, code):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', code + REPORT],
+            check=True, stdout=subprocess.PIPE, env=os.environ.copy()
+        ).stdout
+        duration = time.perf_counter() - start
+        return duration * 1000, json.loads(output.splitlines()[-1])
+
+    def handle(self, *args, **options):
+        os.environ.setdefault(
+            'DJANGO_SETTINGS_MODULE', 'offenegesetze.settings'
+        )
+        with tempfile.TemporaryDirectory(prefix='og_startup_') as doc_path:
+            self.stdout.write('  %-28s %9s %9s %9s  %s' % (
+                'scenario', 'p50', 'p95', 'max', 'loaded'
+            ))
+            for name, code in self.get_scenarios(doc_path):
+                times = []
+                report = None
+                for _ in range(options['runs']):
+                    duration, report = self.run_scenario(code)
+                    times.append(duration)
+                loaded = list(report['modules'])
+                if report['es_client']:
+                    loaded.append('ES client')
+                self.stdout.write('  %-28s %7.0fms %7.0fms %7.0fms  %s' % (
+                    name, percentile(times, 50), percentile(times, 95),
+                    max(times), ', '.join(loaded) or '-'
+                ))
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bgbl.catalogue import build_catalogue
+
+
+class Command(BaseCommand):
+    help = 'Build the publication catalogue and bump its generation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=None,
+                            help='Catalogue file, default OG_CATALOGUE_PATH')
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.CATALOGUE_PATH
+        if not path:
+            raise CommandError('No catalogue path given')
+        count = build_catalogue(path)
+        print('Catalogue with %d entries written to %s' % (count, path))
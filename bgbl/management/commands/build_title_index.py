@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from elasticsearch import helpers
+
+from bgbl.search_indexes import (
+    TITLE_FIELDS, Publication, PublicationTitle, titles_index
+)
+
+
+def has_title_mapping():
+    # Indexes created by writes before init have dynamic text mappings
+    for data in titles_index.get_mapping().values():
+        properties = data['mappings'].get('properties', {})
+        if properties.get('kind', {}).get('type') != 'keyword':
+            return False
+    return True
+
+
+class Command(BaseCommand):
+    help = 'Copy metadata and titles from the publication index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-D', action='store_true', dest='destroy_index',
+                            help='Recreate the titles index')
+
+    def handle(self, *args, **options):
+        if options['destroy_index']:
+            print('Destroying titles index!')
+            titles_index.delete(ignore=404)
+        if not titles_index.exists():
+            PublicationTitle.init()
+        elif not has_title_mapping():
+            raise CommandError(
+                'Titles index was created without its mapping, '
+                'recreate it with -D'
+            )
+
+        es = Publication._get_connection()
+        hits = helpers.scan(
+            es, index=Publication._index._name,
+            query={'_source': list(TITLE_FIELDS)},
+            size=1000
+        )
+        count, errors = helpers.bulk(es, (
+            {
+                '_index': titles_index._name,
+                '_id': hit['_id'],
+                '_source': hit['_source'],
+            } for hit in hits
+        ), raise_on_error=False)
+        titles_index.refresh()
+        print('Indexed %d titles, %d errors' % (count, len(errors)))
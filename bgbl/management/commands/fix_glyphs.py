@@ -1,14 +1,16 @@
 from glob import glob
 import os
-import shutil
 
 from django.core.management.base import BaseCommand
 
 from bgbl.pdf_utils import fix_glyphs, remove_watermark
+from bgbl.storage import DocumentStore
 
 
 class Command(BaseCommand):
     help = 'Fix glyphs pdfs'
+    # Works on files only, the checks would load the API and search code
+    requires_system_checks = []
 
     def add_arguments(self, parser):
         parser.add_argument('doc_path', type=str)
@@ -17,21 +19,23 @@ class Command(BaseCommand):
         doc_path = options['doc_path']
         if doc_path.endswith('.pdf'):
             filenames = [doc_path]
+            store = DocumentStore.for_document(doc_path)
         else:
             pattern = os.path.join(doc_path, '**/*.pdf')
             filenames = glob(pattern, recursive=True)
+            store = DocumentStore(doc_path)
 
         for original_filename in filenames:
             if original_filename.endswith(('_original.pdf', '_watermarked.pdf')):
                 continue
 
             print('Fix glyphs', original_filename)
+            if not store.has_version(original_filename, label='_original'):
+                store.store(original_filename, label='_original')
             fixed_filename = fix_glyphs(original_filename)
-            real_filename = fixed_filename.replace('_fixed.pdf', '.pdf')
+            store.replace(
+                original_filename, fixed_filename, label='_fixed'
+            )
 
-            if os.path.exists(real_filename):
-                os.remove(real_filename)
-            shutil.move(fixed_filename, real_filename)
-
-            print('Adding meta data', real_filename)
-            remove_watermark(real_filename, force=True)
+            print('Adding meta data', original_filename)
+            remove_watermark(original_filename, force=True, store=store)
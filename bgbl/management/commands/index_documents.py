@@ -1,8 +1,10 @@
 import datetime
 from multiprocessing import Pool
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from bgbl.catalogue import build_catalogue
 from bgbl.search_indexes import (
     _destroy_index, init_es
 )
@@ -43,8 +45,12 @@ class Command(BaseCommand):
                             dest='watermark')
         parser.add_argument("-p", action='store_true',
                             dest='parallel')
+        parser.add_argument("-c", action='store_true',
+                            dest='incremental',
+                            help='Import only new or changed issues, '
+                                 'default all years.')
         parser.add_argument('--years', dest='years', action='store',
-                            default=str(datetime.datetime.now().year),
+                            default=None,
                             help='Scrape these years, default latest year. '
                                  'Range and comma-separated allowed.')
         parser.add_argument('--numbers', dest='numbers', action='store',
@@ -62,22 +68,35 @@ class Command(BaseCommand):
                 _destroy_index()
             except Exception:
                 pass
-            init_es()
+        # Entries are written to both indexes, they must not be created
+        # with dynamic mappings on the first write
+        init_es()
+
+        years = options['years']
+        if years is None and not options['incremental']:
+            years = datetime.datetime.now().year
 
         imp = BGBlImporter(
             options['db_path'], options['doc_path'],
             rerun=options['rerun'],
             reindex=options['reindex'],
             watermark=options['watermark'],
-            years=create_range_argument(options['years']),
+            incremental=options['incremental'],
+            years=create_range_argument(years),
             parts=create_range_argument(options['parts']),
             numbers=create_range_argument(options['numbers']),
         )
-        if options['parallel']:
-            with Pool(4) as pool:
-                pool.map(
-                    BGBlImporter.run_task,
-                    list(imp.get_tasks())
-                )
-        else:
-            imp.run_import()
+        try:
+            if options['parallel']:
+                with Pool(4) as pool:
+                    pool.map(
+                        BGBlImporter.run_task,
+                        list(imp.get_tasks())
+                    )
+            else:
+                imp.run_import()
+        finally:
+            # Entries imported before a failure are already searchable
+            if settings.CATALOGUE_PATH:
+                count = build_catalogue(settings.CATALOGUE_PATH)
+                print('Catalogue updated with %d entries' % count)
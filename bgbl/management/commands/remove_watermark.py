@@ -4,10 +4,12 @@ import os
 from django.core.management.base import BaseCommand
 
 from bgbl.pdf_utils import remove_watermark
+from bgbl.storage import DocumentStore
 
 
 class Command(BaseCommand):
     help = 'Remove watermark from pdfs'
+    requires_system_checks = []
 
     def add_arguments(self, parser):
         parser.add_argument('doc_path', type=str)
@@ -16,15 +18,16 @@ class Command(BaseCommand):
         doc_path = options['doc_path']
         if doc_path.endswith('.pdf'):
             filenames = [doc_path]
+            store = DocumentStore.for_document(doc_path)
         else:
             pattern = os.path.join(doc_path, '**/*.pdf')
             filenames = glob(pattern, recursive=True)
+            store = DocumentStore(doc_path)
 
         for filename in filenames:
             if filename.endswith(('_original.pdf', '_watermarked.pdf')):
                 continue
-            watermarked_filename = filename.replace('.pdf', '_watermarked.pdf')
-            if os.path.exists(watermarked_filename):
+            if store.has_version(filename, label='_watermarked'):
                 continue
             print('Removing watermark', filename)
-            remove_watermark(filename)
+            remove_watermark(filename, store=store)
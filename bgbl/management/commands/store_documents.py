@@ -0,0 +1,41 @@
+from glob import glob
+import os
+
+from django.core.management.base import BaseCommand
+
+from bgbl.storage import DocumentStore, get_backup_filename
+
+BACKUP_SUFFIXES = ('_original', '_watermarked', '_backup', '_fixed')
+
+
+class Command(BaseCommand):
+    help = 'Move pdfs and their backup copies into the blob store'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('doc_path', type=str)
+
+    def handle(self, *args, **options):
+        doc_path = options['doc_path']
+        store = DocumentStore(doc_path)
+        pattern = os.path.join(doc_path, '**/*.pdf')
+        filenames = glob(pattern, recursive=True)
+
+        for filename in filenames:
+            if filename.endswith(tuple('%s.pdf' % s for s in BACKUP_SUFFIXES)):
+                continue
+
+            for suffix in BACKUP_SUFFIXES:
+                backup_filename = get_backup_filename(filename, suffix)
+                if not os.path.exists(backup_filename):
+                    continue
+                print('Storing', backup_filename)
+                sha256 = store.add_blob(backup_filename)
+                store.set_version(filename, sha256, label=suffix)
+                os.remove(backup_filename)
+
+            print('Storing', filename)
+            store.store(filename)
+
+        count = store.collect_garbage()
+        print('Deleted %d unreferenced blobs' % count)
@@ -0,0 +1,135 @@
+"""
+Prometheus metrics for the API and the importer.
+
+Metrics are only collected when ``METRICS_ENABLED`` is set and
+prometheus_client is installed, otherwise every metric is a no-op.
+Under gunicorn set ``PROMETHEUS_MULTIPROC_DIR`` to a writable, empty
+directory so that all worker processes report into one registry.
+"""
+from contextlib import contextmanager
+import os
+import time
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+ENABLED = (
+    prometheus_client is not None and
+    getattr(settings, 'METRICS_ENABLED', False)
+)
+
+API_BUCKETS = (
+    .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0
+)
+IMPORT_BUCKETS = (
+    .01, .05, .1, .5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0
+)
+
+
+class NullMetric:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, value=1):
+        pass
+
+
+NULL_METRIC = NullMetric()
+
+
+def histogram(name, documentation, labelnames=(), buckets=API_BUCKETS):
+    if not ENABLED:
+        return NULL_METRIC
+    return prometheus_client.Histogram(
+        name, documentation, labelnames=labelnames, buckets=buckets
+    )
+
+
+def counter(name, documentation, labelnames=()):
+    if not ENABLED:
+        return NULL_METRIC
+    return prometheus_client.Counter(
+        name, documentation, labelnames=labelnames
+    )
+
+
+API_STAGE_SECONDS = histogram(
+    'offenegesetze_api_stage_seconds',
+    'Time spent per stage of a publication API request',
+    labelnames=('action', 'stage')
+)
+API_SERVICE_UNAVAILABLE = counter(
+    'offenegesetze_api_service_unavailable',
+    'Requests answered with 503 because Elasticsearch failed',
+    labelnames=('action',)
+)
+CACHE_REQUESTS = counter(
+    'offenegesetze_cache_requests',
+    'Cache lookups by cache and result',
+    labelnames=('cache', 'result')
+)
+IMPORT_STAGE_SECONDS = histogram(
+    'offenegesetze_import_stage_seconds',
+    'Time spent per stage of importing a publication',
+    labelnames=('stage',), buckets=IMPORT_BUCKETS
+)
+IMPORT_PAGES = counter(
+    'offenegesetze_import_pages',
+    'PDF pages extracted by the importer'
+)
+
+
+@contextmanager
+def _timer(metric):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - start)
+
+
+@contextmanager
+def _null_timer():
+    yield
+
+
+def time_stage(metric, **labels):
+    """
+    Context manager observing the duration of its block on ``metric``.
+    """
+    if not ENABLED:
+        return _null_timer()
+    return _timer(metric.labels(**labels))
+
+
+def record_cache(cache, hit):
+    if ENABLED:
+        CACHE_REQUESTS.labels(
+            cache=cache, result='hit' if hit else 'miss'
+        ).inc()
+
+
+def get_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def metrics_view(request):
+    if not ENABLED:
+        raise Http404
+    return HttpResponse(
+        prometheus_client.generate_latest(get_registry()),
+        content_type=prometheus_client.CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.5 on 2021-08-02 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bgbl', '0002_auto_20200826_2035'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='source_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def clear_entry_content(apps, schema_editor):
+    # The importer used to store the repr of the search index document
+    # instead of the page texts.
+    PublicationEntry = apps.get_model('bgbl', 'PublicationEntry')
+    PublicationEntry.objects.filter(
+        content__startswith='Publication('
+    ).update(content='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bgbl', '0003_publication_source_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_entry_content, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.5 on 2026-10-19 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bgbl', '0004_clear_entry_content'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['kind', 'year', 'number'], name='publication_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['-date', 'kind'], name='publication_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publicationentry',
+            index=models.Index(fields=['publication', 'order'], name='entry_order_idx'),
+        ),
+    ]
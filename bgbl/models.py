@@ -9,6 +9,20 @@ PUBLICATIONS = (
 
 PUBLICATIONS_DICT = dict(PUBLICATIONS)
 
+# Separates the text of the pages in PublicationEntry.content
+PAGE_SEPARATOR = '\f'
+
+
+def parse_publication_id(pk):
+    """
+    Return kind, year, number and order of entry from a search index id.
+    """
+    try:
+        kind, year, number, index_order = pk.split('-')
+        return kind, int(year), int(number), int(index_order) + 2
+    except ValueError:
+        return None
+
 
 class PublicationManager(models.Manager):
     def get_from_filename(self, filename):
@@ -28,11 +42,20 @@ class Publication(models.Model):
     number = models.PositiveIntegerField()
     date = models.DateField()
     page = models.PositiveIntegerField(null=True, blank=True)
+    source_hash = models.CharField(max_length=64, blank=True)
 
     objects = PublicationManager()
 
     class Meta:
         ordering = ('kind', 'number')
+        indexes = [
+            models.Index(
+                fields=['kind', 'year', 'number'], name='publication_id_idx'
+            ),
+            models.Index(
+                fields=['-date', 'kind'], name='publication_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return '%s: %s-%s' % (self.kind, self.year, self.number)
@@ -60,6 +83,20 @@ class Publication(models.Model):
             return self.date.year >= 2005
 
 
+class PublicationEntryQuerySet(models.QuerySet):
+    def get_from_id(self, pk):
+        parts = parse_publication_id(pk)
+        if parts is None:
+            raise self.model.DoesNotExist
+        kind, year, number, order = parts
+        return self.get(
+            publication__kind=kind,
+            publication__year=year,
+            publication__number=number,
+            order=order
+        )
+
+
 class PublicationEntry(models.Model):
     publication = models.ForeignKey(
         Publication, on_delete=models.CASCADE, related_name='entries'
@@ -72,8 +109,15 @@ class PublicationEntry(models.Model):
     num_pages = models.PositiveIntegerField(default=1)
     content = models.TextField(blank=True)
 
+    objects = PublicationEntryQuerySet.as_manager()
+
     class Meta:
         ordering = ('page',)
+        indexes = [
+            models.Index(
+                fields=['publication', 'order'], name='entry_order_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -81,3 +125,36 @@ class PublicationEntry(models.Model):
     @property
     def index_order(self):
         return self.order - 2
+
+    @property
+    def search_id(self):
+        pub = self.publication
+        return '%s-%s-%s-%s' % (
+            pub.kind, pub.year, pub.number, self.index_order
+        )
+
+    def get_pages(self):
+        if not self.content:
+            return None
+        return self.content.split(PAGE_SEPARATOR)
+
+    def get_search_hit(self, content=None):
+        """
+        Return the entry in the shape of a search index hit.
+        """
+        pub = self.publication
+        source = {
+            'kind': pub.kind,
+            'year': pub.year,
+            'number': pub.number,
+            'date': pub.date.isoformat(),
+            'order': self.index_order,
+            'page': self.page,
+            'pdf_page': self.pdf_page,
+            'law_date': self.law_date.isoformat() if self.law_date else None,
+            'num_pages': self.num_pages,
+            'title': self.title,
+        }
+        if content is not None:
+            source['content'] = content
+        return {'_id': self.search_id, '_source': source}
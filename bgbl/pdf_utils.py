@@ -5,12 +5,12 @@ import logging
 import os
 import re
 import subprocess
-import shutil
 import tempfile
 
 from pdfrw import PdfReader, PdfWriter, PdfDict, PdfName, PdfString, PdfTokens
 
 from .models import Publication
+from .storage import DocumentStore
 
 logger = logging.getLogger(__name__)
 
@@ -74,7 +74,11 @@ def fix_glyphs(filename):
 
 
 @contextmanager
-def edit_pdf_doc(filename, backup=True, backup_suffix='_backup'):
+def edit_pdf_doc(filename, backup=True, backup_suffix='_backup',
+                 store=None):
+    if store is None:
+        store = DocumentStore.for_document(filename)
+
     pdf_file = uncompress_pdf(filename)
 
     doc = PdfReader(pdf_file)
@@ -88,23 +92,26 @@ def edit_pdf_doc(filename, backup=True, backup_suffix='_backup'):
     compressed_output = compress_pdf(output)
 
     if backup:
-        backup_path = filename.replace('.pdf', '%s.pdf' % backup_suffix)
-        shutil.move(filename, backup_path)
+        store.store(filename, label=backup_suffix)
 
-    with open(filename, 'wb') as f:
+    edited_filename = filename.replace('.pdf', '_edited.pdf')
+    with open(edited_filename, 'wb') as f:
         f.write(compressed_output.getvalue())
+    store.replace(filename, edited_filename)
 
 
 def remove_watermark(filename, publication=None, force=False,
-                     backup_suffix='_watermarked'):
-    watermarked_filename = filename.replace('.pdf', '%s.pdf' % backup_suffix)
-    if not force and os.path.exists(watermarked_filename):
+                     backup_suffix='_watermarked', store=None):
+    if store is None:
+        store = DocumentStore.for_document(filename)
+    if not force and store.has_version(filename, label=backup_suffix):
         return
 
     if publication is None:
         publication = Publication.objects.get_from_filename(filename)
 
-    with edit_pdf_doc(filename, backup_suffix=backup_suffix) as doc:
+    with edit_pdf_doc(filename, backup_suffix=backup_suffix,
+                      store=store) as doc:
         fix_metadata(
             doc, title=publication.title, creation_date=publication.date
         )
@@ -1,18 +1,106 @@
+from email.utils import format_datetime
+import re
+from xml.sax.saxutils import escape, quoteattr
+
 from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from rest_framework import renderers
 
-from feedgen.feed import FeedGenerator
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson is not None else None
+)
 
 
-class RSSRenderer(renderers.BaseRenderer):
+class JSONRenderer(renderers.JSONRenderer):
     """
-    Renderer which serializes to CustomXML.
+    Renderer which serializes to JSON with orjson if it is installed.
+
+    Output matches the compact, unicode, non-indented output of
+    DRF's JSONRenderer; indented output falls back to it.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not self.compact or self.ensure_ascii:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=ORJSON_OPTIONS
+        )
+        # We always fully escape \u2028 and \u2029 to ensure we output JSON
+        # that is a strict javascript subset, like DRF's renderer does.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(
+                '\u2028'.encode('utf-8'), b'\\u2028'
+            ).replace(
+                '\u2029'.encode('utf-8'), b'\\u2029'
+            )
+        return ret
+
+    def render_stream(self, data, stream_key, accepted_media_type=None,
+                      renderer_context=None):
+        """
+        Yield *data* rendered as JSON in chunks, with the list under
+        *stream_key* emitted item by item as the last key.
+        """
+        items = data.get(stream_key)
+        if items is None:
+            yield self.render(data, accepted_media_type, renderer_context)
+            return
+        head = {k: v for k, v in data.items() if k != stream_key}
+        rendered_head = self.render(
+            head, accepted_media_type, renderer_context
+        )
+        yield rendered_head[:-1] + (b',' if head else b'') + self.render(
+            stream_key) + b':['
+        for i, item in enumerate(items):
+            chunk = self.render(item, accepted_media_type, renderer_context)
+            yield b',' + chunk if i else chunk
+        yield b']}'
+
+
+FEED_TITLE = 'OffeneGesetze.de'
+FEED_DESCRIPTION = 'Feed für Veröffentlichungen des Bundesgesetzblatts'
+FEED_LOGO = 'https://offenegesetze.de/apple-touch-icon.png'
+
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def xml_text(value):
+    return escape(INVALID_XML_CHARS.sub('', str(value)))
+
+
+def xml_attr(value):
+    return quoteattr(INVALID_XML_CHARS.sub('', str(value)))
+
+
+def truncate(text, length):
+    if length and len(text) > length:
+        return text[:length].rstrip() + '…'
+    return text
+
+
+class FeedRenderer(renderers.BaseRenderer):
+    """
+    Base for feed renderers that write XML incrementally
+    without building a document tree.
     """
 
-    media_type = 'application/xml'
-    format = 'rss'
     charset = 'utf-8'
 
     def render(self, data, accepted_media_type=None, renderer_context=None):
@@ -22,37 +110,160 @@ class RSSRenderer(renderers.BaseRenderer):
         if data is None:
             return ''
 
-        fg = FeedGenerator()
-        feed_url = settings.API_URL + reverse('api:veroeffentlichung-list')
-        feed_title = 'OffeneGesetze.de'
-        feed_description = 'Feed für Veröffentlichungen des Bundesgesetzblatts'
-
-        fg.id(feed_url)
-        fg.title(feed_title)
-        fg.subtitle(feed_description)
-        fg.link(href=feed_url, rel='alternate')
-        fg.logo('https://offenegesetze.de/apple-touch-icon.png')
-        fg.link(href=feed_url + '?format=rss', rel='self')
-        fg.language('de')
-        fg.generator('')
-
         if not isinstance(data, list):
             data = [data]
 
-        results = reversed(data[0].get('results', []))
+        self.pretty = getattr(settings, 'FEED_PRETTY', False)
+        self.description_length = getattr(
+            settings, 'FEED_DESCRIPTION_LENGTH', 1000
+        )
+        self.feed_url = settings.API_URL + reverse(
+            'api:veroeffentlichung-list'
+        )
+        self.now = timezone.now()
 
-        for item in results:
-            fe = fg.add_entry()
-            fe.id('%s/%s' % (
-                settings.SITE_URL, item['id'])
-            )
-            fe.pubDate(item['date'])
-            fe.title(item['title'])
-            fe.link({'href': item['url']})
-            if 'content' in item:
-                fe.description(
-                    item['content'] if isinstance(item['content'], str)
-                    else ''.join(item['content'])
-                )
-
-        return fg.rss_str(pretty=True)
+        out = ["<?xml version='1.0' encoding='UTF-8'?>\n"]
+        self.write_head(out)
+        for item in data[0].get('results', []):
+            self.write_item(out, item)
+        self.write_foot(out)
+        return ''.join(out).encode(self.charset)
+
+    def element(self, out, tag, text=None, level=0, **attrs):
+        if self.pretty:
+            out.append('  ' * level)
+        out.append('<%s' % tag)
+        for key, value in attrs.items():
+            out.append(' %s=%s' % (key, xml_attr(value)))
+        if text is None:
+            out.append('/>')
+        else:
+            out.append('>%s</%s>' % (xml_text(text), tag))
+        if self.pretty:
+            out.append('\n')
+
+    def open(self, out, tag, level=0, attrs=''):
+        if self.pretty:
+            out.append('  ' * level)
+        out.append('<%s%s>' % (tag, attrs))
+        if self.pretty:
+            out.append('\n')
+
+    def close(self, out, tag, level=0):
+        if self.pretty:
+            out.append('  ' * level)
+        out.append('</%s>' % tag)
+        if self.pretty:
+            out.append('\n')
+
+    def get_description(self, item):
+        content = item.get('content')
+        if content is None:
+            return None
+        if not isinstance(content, str):
+            content = ''.join(content)
+        return truncate(content, self.description_length)
+
+    def get_date(self, item):
+        value = item.get('date')
+        if not value:
+            return None
+        return parse_datetime(value)
+
+
+class RSSRenderer(FeedRenderer):
+    """
+    Renderer which serializes to RSS 2.0.
+    """
+
+    media_type = 'application/xml'
+    format = 'rss'
+
+    def write_head(self, out):
+        self.open(out, 'rss', attrs=(
+            ' xmlns:atom="http://www.w3.org/2005/Atom" version="2.0"'
+        ))
+        self.open(out, 'channel', level=1)
+        self.element(out, 'title', FEED_TITLE, level=2)
+        self.element(out, 'link', self.feed_url, level=2)
+        self.element(out, 'description', FEED_DESCRIPTION, level=2)
+        self.element(
+            out, 'atom:link', level=2,
+            href=self.feed_url + '?format=rss', rel='self'
+        )
+        self.open(out, 'image', level=2)
+        self.element(out, 'url', FEED_LOGO, level=3)
+        self.element(out, 'title', FEED_TITLE, level=3)
+        self.element(out, 'link', self.feed_url, level=3)
+        self.close(out, 'image', level=2)
+        self.element(out, 'language', 'de', level=2)
+        self.element(
+            out, 'lastBuildDate', format_datetime(self.now), level=2
+        )
+
+    def write_item(self, out, item):
+        self.open(out, 'item', level=2)
+        self.element(out, 'title', item.get('title', ''), level=3)
+        self.element(out, 'link', item['url'], level=3)
+        description = self.get_description(item)
+        if description is not None:
+            self.element(out, 'description', description, level=3)
+        self.element(
+            out, 'guid', '%s/%s' % (settings.SITE_URL, item['id']),
+            level=3, isPermaLink='false'
+        )
+        date = self.get_date(item)
+        if date is not None:
+            self.element(out, 'pubDate', format_datetime(date), level=3)
+        self.close(out, 'item', level=2)
+
+    def write_foot(self, out):
+        self.close(out, 'channel', level=1)
+        self.close(out, 'rss')
+
+
+class AtomRenderer(FeedRenderer):
+    """
+    Renderer which serializes to Atom.
+    """
+
+    media_type = 'application/atom+xml'
+    format = 'atom'
+
+    def write_head(self, out):
+        self.open(out, 'feed', attrs=(
+            ' xmlns="http://www.w3.org/2005/Atom" xml:lang="de"'
+        ))
+        self.element(out, 'id', self.feed_url, level=1)
+        self.element(out, 'title', FEED_TITLE, level=1)
+        self.element(out, 'subtitle', FEED_DESCRIPTION, level=1)
+        self.element(out, 'updated', self.now.isoformat(), level=1)
+        self.element(
+            out, 'link', level=1, href=self.feed_url, rel='alternate'
+        )
+        self.element(
+            out, 'link', level=1,
+            href=self.feed_url + '?format=atom', rel='self'
+        )
+        self.element(out, 'logo', FEED_LOGO, level=1)
+        self.open(out, 'author', level=1)
+        self.element(out, 'name', FEED_TITLE, level=2)
+        self.close(out, 'author', level=1)
+
+    def write_item(self, out, item):
+        self.open(out, 'entry', level=1)
+        self.element(
+            out, 'id', '%s/%s' % (settings.SITE_URL, item['id']), level=2
+        )
+        self.element(out, 'title', item.get('title', ''), level=2)
+        date = self.get_date(item) or self.now
+        self.element(out, 'updated', date.isoformat(), level=2)
+        if item['url']:
+            self.element(out, 'link', level=2, href=item['url'])
+        description = self.get_description(item)
+        if description is not None:
+            self.element(out, 'summary', description, level=2)
+        self.close(out, 'entry', level=1)
+
+    def write_foot(self, out):
+        self.close(out, 'feed')
@@ -1,13 +1,89 @@
+import asyncio
+import weakref
+
 from django.conf import settings
+from elasticsearch.exceptions import SerializationError
+from elasticsearch.serializer import JSONSerializer
 from elasticsearch_dsl import (
-    Document, Date, Integer,
+    Document, Completion, Date, Integer,
     analyzer, Keyword, Text,
     Index, token_filter
 )
 from elasticsearch_dsl import connections
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from elasticsearch import AsyncElasticsearch
+except ImportError:
+    # Needs aiohttp
+    AsyncElasticsearch = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson is not None else None
+)
+
+
+class OrjsonSerializer(JSONSerializer):
+    def loads(self, s):
+        if orjson is None:
+            return super().loads(s)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError as e:
+            raise SerializationError(s, e)
+
+    def dumps(self, data):
+        if orjson is None or isinstance(data, str):
+            return super().dumps(data)
+        try:
+            return orjson.dumps(
+                data, default=self.default, option=ORJSON_OPTIONS
+            ).decode('utf-8')
+        except TypeError as e:
+            raise SerializationError(data, e)
+
+
+# The client is created on first use, processes that never query
+# Elasticsearch do not pay for it
+connections.configure(default={
+    'hosts': [settings.ES_URL],
+    'timeout': 120,
+    'serializer': OrjsonSerializer(),
+})
+
+# Extra keyword arguments for AsyncElasticsearch clients
+async_connection_options = {}
+_async_connections = weakref.WeakKeyDictionary()
+
+
+def get_async_connection():
+    """
+    Return the AsyncElasticsearch client of the running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    es = _async_connections.get(loop)
+    if es is None:
+        es = AsyncElasticsearch(
+            hosts=[settings.ES_URL], timeout=120,
+            serializer=OrjsonSerializer(), **async_connection_options
+        )
+        _async_connections[loop] = es
+    return es
+
+
+async def close_async_connections():
+    """
+    Close the AsyncElasticsearch client of the running event loop.
+    """
+    es = _async_connections.pop(asyncio.get_running_loop(), None)
+    if es is not None:
+        await es.close()
 
-connections.create_connection(hosts=[settings.ES_URL], timeout=120)
 
 decomp = token_filter(
     "decomp",
@@ -37,6 +113,26 @@ og_analyzer = analyzer(
     ],
 )
 
+# Same as og_analyzer without the decompounder. Used for the main text
+# fields and for all queries, compound parts are only indexed in the
+# decomp sub-fields.
+og_search_analyzer = analyzer(
+    'og_search_analyzer',
+    tokenizer='standard',
+    filter=[
+        'keyword_repeat',
+
+        'lowercase',
+        token_filter('stop_de', type='stop', stopwords="_german_"),
+
+        'german_normalization',
+        'asciifolding',
+
+        token_filter('de_stemmer', type='stemmer', name='light_german'),
+        'remove_duplicates'
+    ],
+)
+
 og_quote_analyzer = analyzer(
     'og_quote_analyzer',
     tokenizer='standard',
@@ -50,13 +146,53 @@ og_quote_analyzer = analyzer(
     ],
 )
 
+# Cheap analyzer for the completion field, no decompounding or stemming
+og_suggest_analyzer = analyzer(
+    'og_suggest_analyzer',
+    tokenizer='standard',
+    filter=[
+        'lowercase',
+        'german_normalization',
+        'asciifolding',
+    ],
+)
+
+# Completion inputs start at every word of the title that is at least
+# this long, so that prefixes match words inside titles
+SUGGEST_MIN_WORD_LENGTH = 4
+SUGGEST_MAX_INPUTS = 20
+
+# Default order of listings, the indices are sorted the same way so
+# that sorted listings can stop collecting hits early
+LISTING_ORDERING = ('-date', 'kind', 'order')
+INDEX_SORT = {
+    'sort.field': [f.lstrip('-') for f in LISTING_ORDERING],
+    'sort.order': [
+        'desc' if f.startswith('-') else 'asc' for f in LISTING_ORDERING
+    ],
+}
+
 index = Index('offenegesetze_publications')
 index.settings(
     number_of_shards=1,
-    number_of_replicas=0
+    number_of_replicas=0,
+    **INDEX_SORT
 )
 
 
+def decomp_field():
+    """
+    Sub-field with the compound parts of words, decompounded only at
+    index time.
+    """
+    return Text(
+        analyzer=og_analyzer,
+        search_analyzer=og_search_analyzer,
+        search_quote_analyzer=og_quote_analyzer,
+        index_options='offsets'
+    )
+
+
 @index.document
 class Publication(Document):
     kind = Keyword()
@@ -65,28 +201,93 @@ class Publication(Document):
     date = Date()
     page = Integer()
     order = Integer()
-    num_pages = Integer()
+    num_pages = Integer(doc_values=False)
     title = Text(
-        fields={'raw': Keyword()},
-        analyzer=og_analyzer,
-        search_analyzer=og_analyzer,
+        fields={
+            'raw': Keyword(),
+            'decomp': decomp_field(),
+        },
+        analyzer=og_search_analyzer,
+        search_analyzer=og_search_analyzer,
         search_quote_analyzer=og_quote_analyzer,
         index_options='offsets'
     )
     law_date = Date()
-    pdf_page = Integer()
+    pdf_page = Integer(doc_values=False)
     content = Text(
-        analyzer=og_analyzer,
-        search_analyzer=og_analyzer,
+        fields={
+            'decomp': decomp_field(),
+        },
+        analyzer=og_search_analyzer,
+        search_analyzer=og_search_analyzer,
+        search_quote_analyzer=og_quote_analyzer,
+        index_options='offsets'
+    )
+    suggest = Completion(analyzer=og_suggest_analyzer)
+
+
+def get_suggest_input(title):
+    """
+    Return the completion inputs of ``title``: the title itself and its
+    tails starting at each longer word.
+    """
+    if not title:
+        return []
+    words = title.split()
+    inputs = []
+    for i, word in enumerate(words):
+        if i > 0 and len(word.strip('()[],.;:"')) < SUGGEST_MIN_WORD_LENGTH:
+            continue
+        inputs.append(' '.join(words[i:]))
+        if len(inputs) == SUGGEST_MAX_INPUTS:
+            break
+    return inputs
+
+
+# Metadata and titles without page content for listings and title searches
+titles_index = Index('offenegesetze_titles')
+titles_index.settings(
+    number_of_shards=1,
+    number_of_replicas=0,
+    **INDEX_SORT
+)
+
+TITLE_FIELDS = (
+    'kind', 'year', 'number', 'date', 'page', 'order', 'num_pages',
+    'title', 'law_date', 'pdf_page'
+)
+
+
+@titles_index.document
+class PublicationTitle(Document):
+    kind = Keyword()
+    year = Integer()
+    number = Integer()
+    date = Date()
+    page = Integer()
+    order = Integer()
+    num_pages = Integer(doc_values=False)
+    title = Text(
+        fields={
+            'raw': Keyword(),
+            'decomp': decomp_field(),
+        },
+        analyzer=og_search_analyzer,
+        search_analyzer=og_search_analyzer,
         search_quote_analyzer=og_quote_analyzer,
         index_options='offsets'
     )
+    law_date = Date()
+    pdf_page = Integer(doc_values=False)
 
 
 def _destroy_index():
     index.delete()
+    titles_index.delete(ignore=404)
 
 
 def init_es():
     if not index.exists():
         Publication.init()
+    if not titles_index.exists():
+        PublicationTitle.init()
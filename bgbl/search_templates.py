@@ -0,0 +1,151 @@
+"""
+Request bodies of faceted searches compiled from plain dicts.
+
+elasticsearch_dsl's ``FacetedSearch`` rebuilds the ``Search`` object,
+the filter wrapped aggregations of every facet, highlighting and sorts
+with DSL objects on each request and serializes them again. Everything
+that does not depend on the request is compiled here once per search
+class, requests only fill in query, filters, sort and pagination.
+"""
+from functools import lru_cache
+
+from elasticsearch_dsl import Search
+from elasticsearch_dsl.faceted_search import FacetedResponse
+from elasticsearch_dsl.query import MatchAll
+
+MATCH_ALL = {'match_all': {}}
+
+
+def combine_filters(filters):
+    """
+    Return a filter matching all of ``filters`` the way ``Q & Q`` does.
+    """
+    if not filters:
+        return MATCH_ALL
+    if len(filters) == 1:
+        return filters[0]
+    return {'bool': {'must': list(filters)}}
+
+
+@lru_cache(maxsize=64)
+def compile_sort(sort):
+    return Search().sort(*sort).to_dict().get('sort')
+
+
+class SearchTemplate:
+    """
+    Invariant parts of the request bodies of a search class.
+
+    Compiled parts are shared between requests and must not be
+    modified, bodies only reference them.
+    """
+    def __init__(self, search_class):
+        self.fields = list(search_class.fields)
+        self.facets = search_class.facets
+        self.equivalences = search_class.equivalences
+        self.source = {'excludes': list(search_class.source_excludes)}
+        self.highlight = Search().highlight(
+            *search_class.highlight_fields
+        ).to_dict()['highlight']
+        self.aggs = {
+            name: facet.get_aggregation().to_dict()
+            for name, facet in self.facets.items()
+        }
+        self.unfiltered_aggs = self.build_aggs({})
+
+        # Only used to wrap responses, the filters of its aggregations
+        # do not matter for parsing
+        search = Search(
+            doc_type=search_class.doc_types, index=search_class.index,
+            using=search_class.using
+        ).response_class(FacetedResponse)
+        for name, facet in self.facets.items():
+            search.aggs.bucket(
+                '_filter_' + name, 'filter', filter=MatchAll()
+            ).bucket(name, facet.get_aggregation())
+        self.response_search = search
+
+        self.get_filter = lru_cache(maxsize=1024)(self.compile_filter)
+
+    def compile_filter(self, name, filter_values):
+        """
+        Return the filter of facet ``name`` for the tuple of
+        ``filter_values`` or ``None``.
+        """
+        f = self.facets[name].add_filter(list(filter_values))
+        if f is None:
+            return None
+        return f.to_dict()
+
+    def get_query(self, query):
+        if not query:
+            return None
+        return {
+            'simple_query_string': {
+                'query': query,
+                'fields': self.fields,
+                'default_operator': 'and',
+                'lenient': True,
+            }
+        }
+
+    def get_aggs(self, filters):
+        if not filters:
+            return self.unfiltered_aggs
+        return self.build_aggs(filters)
+
+    def build_aggs(self, filters):
+        """
+        Return the facet aggregations, each filtered by the filters of
+        the other facets that are not equivalent to it.
+        """
+        aggs = {}
+        for name, agg in self.aggs.items():
+            equivalent = self.equivalences.get(name, ())
+            agg_filters = [
+                f for field, f in filters.items()
+                if field != name and field not in equivalent
+            ]
+            aggs['_filter_' + name] = {
+                'filter': combine_filters(agg_filters),
+                'aggs': {name: agg},
+            }
+        return aggs
+
+    def get_body(self, query, post_filters, sort, extra):
+        """
+        Return the body of the hits request.
+        """
+        body = {}
+        query = self.get_query(query)
+        if query is not None:
+            body['query'] = query
+        if post_filters:
+            body['post_filter'] = combine_filters(post_filters)
+        sort = compile_sort(tuple(sort))
+        if sort:
+            body['sort'] = sort
+        body.update(extra)
+        body['_source'] = self.source
+        body['highlight'] = self.highlight
+        return body
+
+    def get_facet_body(self, query, filters):
+        """
+        Return the body of a request that only computes the facets.
+        """
+        body = {'aggs': self.get_aggs(filters), 'size': 0}
+        query = self.get_query(query)
+        if query is not None:
+            body['query'] = query
+        return body
+
+    def make_response(self, data, faceted_search):
+        response = FacetedResponse(self.response_search, data)
+        response._faceted_search = faceted_search
+        return response
+
+
+@lru_cache()
+def get_search_template(search_class):
+    return SearchTemplate(search_class)
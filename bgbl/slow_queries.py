@@ -0,0 +1,83 @@
+"""
+Log searches that take longer than ``SLOW_QUERY_THRESHOLD`` seconds.
+
+Records are written as one JSON object per line to the
+``bgbl.slow_queries`` logger. A sample of searches
+(``SLOW_QUERY_PROFILE_RATE``) is run with the ES profile API so slow
+records can include the time spent per aggregation.
+"""
+import json
+import logging
+import random
+
+from django.conf import settings
+
+logger = logging.getLogger('bgbl.slow_queries')
+
+# Values under these keys describe the query structure, not user input
+STRUCTURAL_KEYS = {
+    'sort', 'field', 'fields', 'calendar_interval', 'default_operator',
+    'lenient', 'order', 'min_doc_count', 'size', 'from', 'track_total_hits',
+    'highlight', '_source', 'profile'
+}
+
+
+def get_threshold():
+    return getattr(settings, 'SLOW_QUERY_THRESHOLD', None)
+
+
+def should_profile():
+    rate = getattr(settings, 'SLOW_QUERY_PROFILE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def normalize_query(body, keep=False):
+    """
+    Replace user supplied values in ``body`` with ``?`` so that
+    queries of the same shape produce the same record.
+    """
+    if isinstance(body, dict):
+        return {
+            k: normalize_query(v, keep=keep or k in STRUCTURAL_KEYS)
+            for k, v in body.items()
+        }
+    if isinstance(body, list):
+        if not keep and all(not isinstance(v, (dict, list)) for v in body):
+            return '?'
+        return [normalize_query(v, keep=keep) for v in body]
+    if keep:
+        return body
+    return '?'
+
+
+def get_aggregation_times(profile):
+    """
+    Sum the profiled time per aggregation over all shards in ms.
+    """
+    times = {}
+
+    def collect(aggs, prefix):
+        for agg in aggs:
+            name = prefix + agg['description']
+            times[name] = times.get(name, 0) + agg['time_in_nanos'] / 1e6
+            collect(agg.get('children', []), name + '>')
+
+    for shard in profile.get('shards', []):
+        collect(shard.get('aggregations', []), '')
+    return {k: round(v, 3) for k, v in times.items()}
+
+
+def log_slow_query(body, response, duration):
+    data = response.to_dict()
+    hits = data.get('hits', {})
+    record = {
+        'duration': round(duration * 1000, 3),
+        'took': data.get('took'),
+        'query': normalize_query(body),
+        'hits': len(hits.get('hits', [])),
+        'total': hits.get('total'),
+        'timed_out': data.get('timed_out'),
+    }
+    if 'profile' in data:
+        record['aggregations'] = get_aggregation_times(data['profile'])
+    logger.warning(json.dumps(record, sort_keys=True))
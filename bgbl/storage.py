@@ -0,0 +1,215 @@
+"""
+Content-addressed storage for document PDFs.
+
+Every version of a document is stored once as a blob named after its
+SHA-256 digest under ``{doc_path}/.blobs/``. The canonical
+``{kind}/{year}/{kind}_{year}_{number}.pdf`` paths are hardlinks (or
+symlinks as a fallback) to the current blob and a small sqlite index
+records which blob backs which processing state of a document. Blobs no
+version refers to anymore are deleted.
+"""
+from contextlib import closing
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = '.blobs'
+INDEX_FILENAME = 'index.sqlite'
+CURRENT = 'current'
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_backup_filename(filename, label):
+    # Backup copies next to documents from before the store
+    return filename.replace('.pdf', '%s.pdf' % label)
+
+
+def get_doc_path(filename):
+    # {doc_path}/{kind}/{year}/{kind}_{year}_{number}.pdf
+    filename = os.path.abspath(filename)
+    return os.path.dirname(os.path.dirname(os.path.dirname(filename)))
+
+
+class DocumentStore:
+    def __init__(self, doc_path):
+        self.doc_path = os.path.abspath(doc_path)
+        self.blob_path = os.path.join(self.doc_path, BLOB_DIR)
+        self.index_path = os.path.join(self.blob_path, INDEX_FILENAME)
+        self._db = None
+
+    @classmethod
+    def for_document(cls, filename):
+        return cls(get_doc_path(filename))
+
+    @property
+    def db(self):
+        if self._db is None:
+            os.makedirs(self.blob_path, exist_ok=True)
+            self._db = sqlite3.connect(self.index_path)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS versions ('
+                'path TEXT NOT NULL, label TEXT NOT NULL, '
+                'sha256 TEXT NOT NULL, PRIMARY KEY (path, label))'
+            )
+        return self._db
+
+    def get_key(self, filename):
+        return os.path.relpath(os.path.abspath(filename), self.doc_path)
+
+    def get_blob_path(self, sha256):
+        return os.path.join(
+            self.blob_path, sha256[:2], '%s.pdf' % sha256
+        )
+
+    def get_version(self, filename, label=CURRENT):
+        if self._db is None and not os.path.exists(self.index_path):
+            return None
+        with closing(self.db.execute(
+                'SELECT sha256 FROM versions WHERE path = ? AND label = ?',
+                (self.get_key(filename), label))) as cursor:
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def has_version(self, filename, label=CURRENT):
+        if self.get_version(filename, label=label) is not None:
+            return True
+        # Trees not moved into the store by store_documents yet
+        return label != CURRENT and os.path.exists(
+            get_backup_filename(filename, label)
+        )
+
+    def get_version_path(self, filename, label=CURRENT):
+        sha256 = self.get_version(filename, label=label)
+        if sha256 is None:
+            return None
+        return self.get_blob_path(sha256)
+
+    def set_version(self, filename, sha256, label=CURRENT):
+        old_sha256 = self.get_version(filename, label=label)
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO versions (path, label, sha256) '
+                'VALUES (?, ?, ?)',
+                (self.get_key(filename), label, sha256)
+            )
+        if old_sha256 is not None and old_sha256 != sha256:
+            self.release_blob(old_sha256)
+
+    def is_referenced(self, sha256):
+        with closing(self.db.execute(
+                'SELECT 1 FROM versions WHERE sha256 = ? LIMIT 1',
+                (sha256,))) as cursor:
+            return cursor.fetchone() is not None
+
+    def release_blob(self, sha256):
+        """
+        Delete the blob with digest ``sha256`` if no version refers to it.
+        """
+        if self.is_referenced(sha256):
+            return False
+        try:
+            os.remove(self.get_blob_path(sha256))
+        except FileNotFoundError:
+            return False
+        logger.debug('Deleted unreferenced blob %s', sha256)
+        return True
+
+    def collect_garbage(self):
+        """
+        Delete all blobs no version refers to and return their number.
+
+        Blobs are added before their versions are recorded, do not run
+        this while documents are being stored.
+        """
+        count = 0
+        for dirpath, _dirnames, filenames in os.walk(self.blob_path):
+            for name in filenames:
+                if not name.endswith('.pdf'):
+                    continue
+                if self.release_blob(name[:-len('.pdf')]):
+                    count += 1
+        return count
+
+    def add_blob(self, filename):
+        """
+        Store contents of ``filename`` as blob and return its digest.
+        """
+        sha256 = hash_file(filename)
+        blob_path = self.get_blob_path(sha256)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = blob_path + '.tmp'
+            try:
+                os.link(os.path.realpath(filename), tmp_path)
+            except OSError:
+                shutil.copyfile(filename, tmp_path)
+            os.replace(tmp_path, blob_path)
+        return sha256
+
+    def link_blob(self, sha256, filename):
+        """
+        Atomically point ``filename`` at the blob with digest ``sha256``.
+        """
+        blob_path = self.get_blob_path(sha256)
+        tmp_path = filename + '.tmp'
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(blob_path, tmp_path)
+        except OSError:
+            os.symlink(
+                os.path.relpath(blob_path, os.path.dirname(filename)),
+                tmp_path
+            )
+        os.replace(tmp_path, filename)
+
+    def store(self, filename, label=CURRENT):
+        """
+        Record the current contents of ``filename`` under ``label``
+        and make sure the canonical path is linked to its blob.
+        """
+        sha256 = self.add_blob(filename)
+        if not self.is_linked(filename, sha256):
+            self.link_blob(sha256, filename)
+        self.set_version(filename, sha256, label=CURRENT)
+        if label != CURRENT:
+            self.set_version(filename, sha256, label=label)
+        return sha256
+
+    def replace(self, filename, new_filename, label=CURRENT):
+        """
+        Replace ``filename`` with the contents of ``new_filename``.
+
+        The canonical file is swapped for a link to the new blob and never
+        written through, so blobs shared with other versions stay intact.
+        """
+        sha256 = self.add_blob(new_filename)
+        self.link_blob(sha256, filename)
+        if os.path.abspath(new_filename) != os.path.abspath(filename):
+            os.remove(new_filename)
+        self.set_version(filename, sha256, label=CURRENT)
+        if label != CURRENT:
+            self.set_version(filename, sha256, label=label)
+        return sha256
+
+    def is_linked(self, filename, sha256):
+        blob_path = self.get_blob_path(sha256)
+        try:
+            return os.path.samefile(filename, blob_path)
+        except OSError:
+            return False
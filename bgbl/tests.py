@@ -0,0 +1,94 @@
+import copy
+
+from django.test import SimpleTestCase
+
+from rest_framework.renderers import JSONRenderer
+
+from .api_views import (
+    PublicationDetailSerializer, PublicationSerializer, serialize_hit
+)
+from .search_indexes import Publication
+
+SOURCE = {
+    'kind': 'bgbl1', 'year': 2020, 'number': 14, 'order': 3,
+    'date': '2020-03-27T00:00:00', 'page': 575, 'pdf_page': 5,
+    'num_pages': 4, 'title': 'Gesetz zur Abmilderung der Folgen',
+    'law_date': '2020-03-27T00:00:00',
+    'content': ['Gesetz zur Abmilderung', 'Artikel 1', 'Änderung'],
+}
+
+
+def make_hit(hit_id='bgbl1-2020-14-3', score=None, highlight=None,
+             **source):
+    hit = {'_id': hit_id, '_source': dict(SOURCE, **source)}
+    if score is not None:
+        hit['_score'] = score
+    if highlight is not None:
+        hit['highlight'] = highlight
+    return hit
+
+
+class SerializeHitTest(SimpleTestCase):
+    """
+    ``serialize_hit`` must render hits exactly like the reference
+    serializers it replaces.
+    """
+    renderer = JSONRenderer()
+
+    def assertSameRepresentation(self, hit):
+        doc = Publication.from_es(copy.deepcopy(hit))
+        for detail, serializer_class in (
+                (False, PublicationSerializer),
+                (True, PublicationDetailSerializer)):
+            with self.subTest(detail=detail):
+                expected = serializer_class(doc).data
+                result = serialize_hit(hit, detail=detail)
+                self.assertEqual(dict(result), dict(expected))
+                self.assertEqual(
+                    self.renderer.render(result),
+                    self.renderer.render(expected)
+                )
+
+    def test_full_hit(self):
+        self.assertSameRepresentation(make_hit(score=3.5))
+
+    def test_highlight(self):
+        self.assertSameRepresentation(make_hit(score=1.25, highlight={
+            'title': ['<em>Gesetz</em> zur Abmilderung'],
+            'content': ['<em>Gesetz</em>', 'Artikel 1'],
+        }))
+
+    def test_decomp_highlight(self):
+        self.assertSameRepresentation(make_hit(score=2.0, highlight={
+            'title.decomp': ['<em>Gesetz</em> zur Abmilderung'],
+            'content.decomp': ['Abmilderungs<em>gesetz</em>'],
+        }))
+
+    def test_partial_highlight(self):
+        self.assertSameRepresentation(make_hit(score=2.0, highlight={
+            'content': ['<em>Artikel</em> 1'],
+        }))
+
+    def test_without_score(self):
+        self.assertSameRepresentation(make_hit())
+        self.assertSameRepresentation(make_hit(score=0))
+
+    def test_without_pdf_page(self):
+        self.assertSameRepresentation(make_hit(pdf_page=None))
+        self.assertSameRepresentation(make_hit(pdf_page=0))
+
+    def test_without_law_date(self):
+        self.assertSameRepresentation(make_hit(law_date=None))
+
+    def test_dates_with_time_zone(self):
+        self.assertSameRepresentation(make_hit(
+            date='2020-03-27T10:00:00+02:00', law_date='2020-03-26'
+        ))
+
+    def test_optional_fields_missing(self):
+        hit = make_hit(hit_id='bgbl2-2020-14-4', page=None, title=None)
+        del hit['_source']['content']
+        self.assertSameRepresentation(hit)
+
+    def test_empty_content(self):
+        self.assertSameRepresentation(make_hit(content=[], title=''))
@@ -0,0 +1,46 @@
+"""
+Build the lazily created state of the API before serving requests.
+
+With a preloading server this runs once in the master process, so all
+forked workers share the resulting objects copy-on-write instead of
+building them on their first requests.
+"""
+from django.db import connections as db_connections
+from django.urls import get_resolver
+
+from .api_views import (
+    PublicationSearch, PublicationTitleScopeSearch, PublicationTitleSearch,
+    get_api_url_parts, serialize_hit
+)
+from .catalogue import get_catalogue
+
+SAMPLE_HIT = {
+    '_id': 'bgbl1-2000-1-0',
+    '_source': {
+        'kind': 'bgbl1', 'year': 2000, 'number': 1, 'order': 0,
+        'date': '2000-01-01T00:00:00', 'page': 1, 'pdf_page': 1,
+        'num_pages': 1, 'title': '', 'content': [''],
+    },
+}
+
+
+def warm_up():
+    """
+    Load URL patterns, hit serialization, search bodies and the catalogue.
+
+    Does not create the Elasticsearch client and closes database
+    connections, forked workers must not share them.
+    """
+    get_resolver().url_patterns
+    get_api_url_parts()
+
+    serialize_hit(SAMPLE_HIT, detail=True)
+
+    for search_class in (PublicationSearch, PublicationTitleScopeSearch,
+                         PublicationTitleSearch):
+        search_class().get_facet_body()
+        search_class(query='Gesetz').get_hits_body()
+
+    get_catalogue()
+
+    db_connections.close_all()
@@ -0,0 +1,36 @@
+"""
+ASGI config for offenegesetze project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Publication list, detail and feeds are served by async views, e.g. with
+``gunicorn -k uvicorn.workers.UvicornWorker offenegesetze.asgi:application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'offenegesetze.settings')
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'offenegesetze.asgi_urls')
+
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+    # Django does not support the lifespan protocol, close the clients
+    # of the event loop on shutdown here
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            from bgbl.search_indexes import close_async_connections
+
+            await close_async_connections()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
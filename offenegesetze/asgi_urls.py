@@ -0,0 +1,33 @@
+"""offenegesetze URL Configuration for the ASGI application
+
+Publication list, detail and feeds use async views, all other routes are
+the same as in the WSGI configuration.
+"""
+from django.urls import path, re_path
+
+from bgbl import async_views
+from bgbl.api_views import PublicationViewSet
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('v1/veroeffentlichung/', async_views.publication_list),
+    path('v1/veroeffentlichung/rss/', async_views.publication_rss),
+    path('v1/veroeffentlichung/atom/', async_views.publication_atom),
+    path(
+        'v1/veroeffentlichung/facets/',
+        PublicationViewSet.as_view({'get': 'facets'})
+    ),
+    path(
+        'v1/veroeffentlichung/suggest/',
+        PublicationViewSet.as_view({'get': 'suggest'})
+    ),
+    path(
+        'v1/veroeffentlichung/overview/',
+        PublicationViewSet.as_view({'get': 'overview'})
+    ),
+    re_path(
+        r'^v1/veroeffentlichung/(?P<pk>[^/.]+)/$',
+        async_views.publication_detail
+    ),
+] + sync_urlpatterns
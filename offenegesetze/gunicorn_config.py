@@ -0,0 +1,73 @@
+"""
+Gunicorn configuration for offenegesetze.
+
+Use with ``gunicorn -c python:offenegesetze.gunicorn_config
+offenegesetze.wsgi:application``. By default the application is loaded
+and warmed up in the master process before forking, so workers share
+Django, the search definitions and the catalogue copy-on-write.
+
+Environment variables:
+
+- ``GUNICORN_WORKERS``: worker processes, default 2 * CPUs + 1
+- ``GUNICORN_THREADS``: threads per worker, default 2
+- ``GUNICORN_PRELOAD``: ``0`` to load the application in each worker
+- ``GUNICORN_BIND``, ``GUNICORN_TIMEOUT``, ``GUNICORN_LOG_LEVEL``,
+  ``GUNICORN_ACCESS_LOG``, ``GUNICORN_ERROR_LOG``
+"""
+import gc
+import os
+
+
+def env(a, b=None):
+    return os.environ.get(a, b)
+
+
+def get_cpu_count():
+    # Respect CPU affinity of containers where available
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = env('GUNICORN_BIND', '0.0.0.0:8045')
+proc_name = 'offenegesetze_gunicorn'
+workers = int(env('GUNICORN_WORKERS', get_cpu_count() * 2 + 1))
+# Requests mostly wait for Elasticsearch
+threads = int(env('GUNICORN_THREADS', 2))
+timeout = int(env('GUNICORN_TIMEOUT', 30))
+preload_app = env('GUNICORN_PRELOAD', '1') == '1'
+loglevel = env('GUNICORN_LOG_LEVEL', 'info')
+accesslog = env('GUNICORN_ACCESS_LOG')
+errorlog = env('GUNICORN_ERROR_LOG', '-')
+
+
+def warm_up():
+    from bgbl.warmup import warm_up
+
+    warm_up()
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    warm_up()
+    # Move everything loaded so far out of the collector's reach, so
+    # collections in workers do not touch and copy the shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        warm_up()
+
+
+def child_exit(server, worker):
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
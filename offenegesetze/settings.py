@@ -13,10 +13,6 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 import os
 import logging
 
-import sentry_sdk
-from sentry_sdk.integrations.django import DjangoIntegration
-from sentry_sdk.integrations.logging import LoggingIntegration
-
 
 def env(a, b=None):
     return os.environ.get(a, b)
@@ -63,7 +59,7 @@ MIDDLEWARE = [
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'offenegesetze.urls'
+ROOT_URLCONF = env('DJANGO_ROOT_URLCONF', 'offenegesetze.urls')
 
 TEMPLATES = [
     {
@@ -88,6 +84,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'offenegesetze.wsgi.application'
+ASGI_APPLICATION = 'offenegesetze.asgi.application'
 
 
 # Database
@@ -102,6 +99,16 @@ DATABASES = {
 
 ES_URL = env('OG_ELASTICSEARCH_URI', 'http://localhost:9200')
 
+CACHES = {
+    'default': {
+        'BACKEND': env(
+            'DJANGO_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': env('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -190,6 +197,69 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 API_URL = 'https://api.offenegesetze.de'
 SITE_URL = 'https://offenegesetze.de'
 
+METRICS_ENABLED = env('OG_METRICS', '0') == '1'
+
+# Serve listings and title searches from the titles index, build it
+# with the build_title_index command before enabling
+TITLE_INDEX_ENABLED = env('OG_TITLE_INDEX', '0') == '1'
+
+# Catalogue of entry metadata for the overview and feeds,
+# built by build_catalogue and after imports. Empty disables it.
+CATALOGUE_PATH = env('OG_CATALOGUE_PATH')
+# Seconds between checks of the catalogue generation file per worker
+CATALOGUE_CHECK_INTERVAL = float(env('OG_CATALOGUE_CHECK_INTERVAL', 5))
+
+# Searches count matches up to these limits unless exact counts are
+# requested, lower limits let sorted listings terminate early
+LIST_TOTAL_HITS_LIMIT = int(env('OG_LIST_TOTAL_HITS_LIMIT', 10000))
+SEARCH_TOTAL_HITS_LIMIT = int(env('OG_SEARCH_TOTAL_HITS_LIMIT', 1000))
+
+# Seconds facet aggregations of a search are cached, 0 disables
+FACET_CACHE_TIMEOUT = int(env('OG_FACET_CACHE_TIMEOUT', 300))
+
+# Searches slower than this many seconds are logged, empty disables
+SLOW_QUERY_THRESHOLD = env('OG_SLOW_QUERY_THRESHOLD', '0.5')
+SLOW_QUERY_THRESHOLD = (
+    float(SLOW_QUERY_THRESHOLD) if SLOW_QUERY_THRESHOLD else None
+)
+# Fraction of searches run with the ES profile API
+SLOW_QUERY_PROFILE_RATE = float(env('OG_SLOW_QUERY_PROFILE_RATE', 0))
+# Shared by all worker processes, rotate it externally (e.g. logrotate),
+# the file is reopened when it is moved away
+SLOW_QUERY_LOG = env('OG_SLOW_QUERY_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'slow_query': {
+            'format': '%(asctime)s %(message)s',
+        }
+    },
+    'handlers': {
+        'slow_query': {
+            'level': 'WARNING',
+            'class': 'logging.handlers.WatchedFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'formatter': 'slow_query',
+        } if SLOW_QUERY_LOG else {
+            'level': 'WARNING',
+            'class': 'logging.StreamHandler',
+            'formatter': 'slow_query',
+        }
+    },
+    'loggers': {
+        'bgbl.slow_queries': {
+            'handlers': ['slow_query'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    }
+}
+
+FEED_PRETTY = env('OG_FEED_PRETTY', '0') == '1'
+FEED_DESCRIPTION_LENGTH = int(env('OG_FEED_DESCRIPTION_LENGTH', 1000))
+
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 REST_FRAMEWORK = {
@@ -199,11 +269,19 @@ REST_FRAMEWORK = {
     'UNAUTHENTICATED_USER': None
 }
 
-sentry_logging = LoggingIntegration(
-    level=logging.INFO,  # Capture info and above as breadcrumbs
-    event_level=logging.ERROR,  # Send errors as events
-)
-sentry_sdk.init(
-    dsn=env('DJANGO_SENTRY_DSN'),
-    integrations=[sentry_logging, DjangoIntegration()]
-)
+SENTRY_DSN = env('DJANGO_SENTRY_DSN')
+if SENTRY_DSN:
+    # Importing sentry_sdk loads all its integrations, skip it when
+    # errors are not reported anyway
+    import sentry_sdk
+    from sentry_sdk.integrations.django import DjangoIntegration
+    from sentry_sdk.integrations.logging import LoggingIntegration
+
+    sentry_logging = LoggingIntegration(
+        level=logging.INFO,  # Capture info and above as breadcrumbs
+        event_level=logging.ERROR,  # Send errors as events
+    )
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        integrations=[sentry_logging, DjangoIntegration()]
+    )
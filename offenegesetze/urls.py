@@ -7,6 +7,7 @@ from rest_framework.routers import DefaultRouter
 from rest_framework.schemas import get_schema_view
 
 from bgbl.api_views import PublicationViewSet
+from bgbl.metrics import metrics_view
 
 api_router = DefaultRouter()
 
@@ -21,4 +22,5 @@ schema_view = get_schema_view(title='Offenegesetze.de API')
 urlpatterns = [
     path('v1/', include((api_router.urls, 'api'))),
     path('v1/schema/', schema_view),
+    path('metrics', metrics_view),
 ]